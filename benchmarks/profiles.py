@@ -0,0 +1,60 @@
+"""Compare insert throughput with each of the PRAGMA profiles in
+`dbtools.profiles`, inserting rows in small committed chunks (as when
+logging data as it comes in) and all at once.
+
+Usage::
+
+    python benchmarks/profiles.py [nrows]
+
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from dbtools import Table
+from dbtools.profiles import profiles
+
+
+def setup(nrows):
+    data = pd.DataFrame({
+        'subject': np.random.randint(0, 100, nrows),
+        'rt': np.random.rand(nrows)},
+        columns=['subject', 'rt'])
+    data.index.name = 'trial'
+    return data
+
+
+def insert(path, profile, data, chunksize):
+    tbl = Table.create(
+        path, "Trials", [('trial', int), ('subject', int), ('rt', float)],
+        primary_key='trial')
+    with tbl.profile(profile):
+        start = timeit.default_timer()
+        tbl.insert(data, chunksize=chunksize)
+        return timeit.default_timer() - start
+
+
+if __name__ == "__main__":
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    data = setup(nrows)
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for chunksize in (100, None):
+            print("chunksize=%s" % chunksize)
+            for profile in sorted(profiles):
+                times = []
+                for i in range(3):
+                    path = os.path.join(
+                        tmpdir, "%s_%s_%d.db" % (profile, chunksize, i))
+                    times.append(insert(path, profile, data, chunksize))
+                print("  %-20s %8.3f s  %10.0f rows/s" % (
+                    profile, min(times), nrows / min(times)))
+    finally:
+        shutil.rmtree(tmpdir)
@@ -0,0 +1,48 @@
+"""Compare the typed array fetch path of `Table.select` against
+building the DataFrame from a list of row tuples.
+
+Usage::
+
+    python benchmarks/select_arrays.py [nrows]
+
+"""
+
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from dbtools import Table
+from dbtools.util import sql_execute
+
+
+def setup(nrows):
+    data = pd.DataFrame({
+        'subject': np.random.randint(0, 100, nrows),
+        'trial': np.arange(nrows),
+        'rt': np.random.rand(nrows),
+        'correct': np.random.randint(0, 2, nrows)},
+        columns=['subject', 'trial', 'rt', 'correct'])
+    data.index.name = 'id'
+    return Table.create(':memory:', "Trials", data)
+
+
+def select_records(tbl):
+    cmd, cols, index, where_str = tbl._select_query()
+    rows = sql_execute(tbl.db, cmd, fetchall=True)
+    return pd.DataFrame.from_records(
+        rows, columns=cols, index=index, coerce_float=True)
+
+
+def select_arrays(tbl):
+    return tbl.select()
+
+
+if __name__ == "__main__":
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    tbl = setup(nrows)
+
+    for func in (select_records, select_arrays):
+        times = timeit.repeat(lambda: func(tbl), number=1, repeat=3)
+        print("%-16s %8.3f s" % (func.__name__, min(times)))
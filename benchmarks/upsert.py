@@ -0,0 +1,60 @@
+"""Compare `Table.upsert` against selecting the existing keys, diffing
+in pandas, and then inserting and updating separately.
+
+Usage::
+
+    python benchmarks/upsert.py [nrows]
+
+"""
+
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from dbtools import Table
+
+
+def setup(nrows):
+    data = pd.DataFrame({
+        'subject': np.random.randint(0, 100, nrows),
+        'rt': np.random.rand(nrows)},
+        columns=['subject', 'rt'])
+    data.index.name = 'trial'
+    tbl = Table.create(':memory:', "Trials", data)
+
+    # half of the batch overlaps with the existing rows
+    batch = pd.DataFrame({
+        'subject': np.random.randint(0, 100, nrows),
+        'rt': np.random.rand(nrows)},
+        columns=['subject', 'rt'],
+        index=pd.Index(np.arange(nrows // 2, nrows // 2 + nrows),
+                       name='trial'))
+    return tbl, batch
+
+
+def select_diff_insert(tbl, batch):
+    existing = tbl.select(columns=[])
+    old = batch.index.isin(existing.index)
+    tbl.update_many(batch[old])
+    new = batch[~old].reset_index()
+    tbl.insert([tuple(row) for row in new.itertuples(index=False)])
+
+
+def upsert(tbl, batch):
+    rows = [tuple(row) for row in batch.reset_index().itertuples(index=False)]
+    tbl.upsert(rows)
+
+
+if __name__ == "__main__":
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    for func in (select_diff_insert, upsert):
+        def run():
+            tbl, batch = setup(nrows)
+            start = timeit.default_timer()
+            func(tbl, batch)
+            return timeit.default_timer() - start
+        times = [run() for i in range(3)]
+        print("%-20s %8.3f s" % (func.__name__, min(times)))
@@ -1,2 +1,4 @@
 from .table import Table
-__all__ = ['Table']
+from .connection import ConnectionPool, connect
+from .transaction import transaction
+__all__ = ['Table', 'ConnectionPool', 'connect', 'transaction']
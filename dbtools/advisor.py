@@ -0,0 +1,136 @@
+import re
+import threading
+
+from collections import OrderedDict, namedtuple
+
+from .util import sql_execute
+
+
+#: A suggested index: the table and columns to index, and the number of
+#: selects (and the total time, in seconds) that filtered on them
+Advice = namedtuple('Advice', ['table', 'columns', 'selects', 'seconds',
+                               'plan'])
+
+
+def where_columns(where, columns):
+    r"""
+    Find the names of the columns in `columns` that are used in the
+    conditional string `where`, in order of first use.
+
+    """
+
+    # ignore string literals
+    where = re.sub(r"'(?:[^']|'')*'", "''", where)
+    names = []
+    for name in re.findall(r"[A-Za-z_][A-Za-z0-9_]*", where):
+        if name in columns and name not in names:
+            names.append(name)
+    return tuple(names)
+
+
+def query_plan(conn, cmd, verbose=False):
+    r"""
+    Get the details of the ``EXPLAIN QUERY PLAN`` output for the
+    command `cmd` (as passed to :func:`~dbtools.util.sql_execute`).
+
+    """
+
+    cmd = ["EXPLAIN QUERY PLAN " + cmd[0]] + list(cmd[1:])
+    rows = sql_execute(conn, cmd, fetchall=True, verbose=verbose)
+    return tuple([row[-1] for row in rows])
+
+
+def is_scan(plan):
+    r"""
+    Check whether a query plan includes a full scan of a table (rather
+    than a search, or a scan of a covering index).
+
+    """
+
+    return any(detail.startswith("SCAN") and "USING" not in detail
+               for detail in plan)
+
+
+class IndexAdvisor(object):
+    r"""
+    Record which columns selects filter on, and suggest indexes for
+    them.
+
+    Pass an advisor to :class:`~dbtools.Table` to use it. Every
+    :meth:`~dbtools.Table.select` with a ``WHERE`` clause is then
+    recorded under the columns it refers to, and for selects that take
+    at least `threshold` seconds, the query plan is looked up with
+    ``EXPLAIN QUERY PLAN``. Columns whose slow selects scan the whole
+    table are reported by :meth:`~dbtools.advisor.IndexAdvisor.advice`,
+    and can be indexed with :meth:`~dbtools.Table.create_index`::
+
+        advisor = IndexAdvisor()
+        tbl = Table("data.db", "Trials", advisor=advisor)
+        ...
+        for advice in advisor.advice():
+            Table("data.db", advice.table).create_index(advice.columns)
+
+    An advisor can be shared by several tables.
+
+    Parameters
+    ----------
+    threshold : float (default=0.1)
+        Minimum duration, in seconds, of selects for which the query
+        plan is looked up.
+
+    """
+
+    def __init__(self, threshold=0.1):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # maps (table, columns) to [selects, seconds, plan]
+        self._usage = OrderedDict()
+
+    def record(self, conn, table, cmd, columns, seconds, verbose=False):
+        r"""
+        Record a select on `table` that filtered on `columns` and took
+        `seconds` to run.
+
+        """
+
+        if len(columns) == 0:
+            return
+        plan = None
+        if seconds >= self.threshold:
+            plan = query_plan(conn, cmd, verbose=verbose)
+
+        with self._lock:
+            entry = self._usage.setdefault((table, columns), [0, 0.0, None])
+            entry[0] += 1
+            entry[1] += seconds
+            if plan is not None:
+                entry[2] = plan
+
+    def advice(self):
+        r"""
+        Get the indexes that would turn slow table scans into searches.
+
+        Returns
+        -------
+        advice : list of :class:`~dbtools.advisor.Advice`
+            The suggested indexes, with the most time spent on selects
+            first.
+
+        """
+
+        with self._lock:
+            usage = list(self._usage.items())
+
+        advice = [Advice(table, columns, selects, seconds, plan)
+                  for (table, columns), (selects, seconds, plan) in usage
+                  if plan is not None and is_scan(plan)]
+        return sorted(advice, key=lambda x: -x.seconds)
+
+    def clear(self):
+        r"""
+        Discard everything that has been recorded.
+
+        """
+
+        with self._lock:
+            self._usage.clear()
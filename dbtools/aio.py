@@ -0,0 +1,218 @@
+import asyncio
+import functools
+import os
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .table import Table
+from .util import string_types
+
+# single-thread executors for database paths
+_executors = {}
+_lock = threading.Lock()
+
+
+def get_executor(db):
+    r"""
+    Get the single-thread executor on which operations on the database
+    `db` are run.
+
+    All :class:`~dbtools.aio.AsyncTable` objects for the same database
+    path (or the same connection, for connections opened by dbtools)
+    share an executor, and thus a connection, as SQLite connections can
+    only be used from the thread that opened them. In-memory databases
+    get a new executor every time.
+
+    """
+
+    if isinstance(db, string_types):
+        if db in ("", ":memory:"):
+            return ThreadPoolExecutor(1)
+        key = os.path.abspath(db)
+        with _lock:
+            if key not in _executors:
+                _executors[key] = ThreadPoolExecutor(1)
+            return _executors[key]
+
+    try:
+        return db._dbtools_executor
+    except AttributeError:
+        pass
+
+    executor = ThreadPoolExecutor(1)
+    try:
+        db._dbtools_executor = executor
+    except AttributeError:
+        pass
+    return executor
+
+
+def _open(executor, func, *args, **kwargs):
+    r"""
+    Create a :class:`~dbtools.Table` on the executor thread, and remember
+    the executor on its connection.
+
+    """
+
+    tbl = func(*args, **kwargs)
+    try:
+        tbl.db._dbtools_executor = executor
+    except AttributeError:
+        pass
+    return tbl
+
+
+class AsyncTable(object):
+    r"""
+    Asynchronous version of :class:`~dbtools.Table`, for use with
+    `asyncio`.
+
+    The methods take the same arguments as the corresponding
+    :class:`~dbtools.Table` methods, but run on a dedicated thread for
+    the database (see :func:`~dbtools.aio.get_executor`) and return
+    awaitables, so they do not block the event loop::
+
+        tbl = AsyncTable("data.db", "Trials")
+        await tbl.insert(trial)
+        data = await tbl.select(where="subject=1")
+        async for chunk in tbl.iter_select(chunksize=1000):
+            process(chunk)
+
+    The table is opened in the background, so errors (e.g. if the table
+    does not exist) are raised by the first operation that is awaited.
+
+    Parameters
+    ----------
+    db : string or sqlite3.Connection
+        Path to the SQLite database, or a connection to the database. A
+        connection must be usable from other threads (i.e., opened with
+        ``check_same_thread=False``).
+    name : string
+        The name of the table in the database.
+    verbose : bool (default=False)
+        Print out SQL command information.
+    **kwargs
+        Other arguments to :class:`~dbtools.Table`.
+
+    """
+
+    def __init__(self, db, name, verbose=False, **kwargs):
+        self.name = str(name)
+        self._executor = get_executor(db)
+        self._table = self._executor.submit(
+            _open, self._executor, Table, db, name, verbose=verbose,
+            **kwargs)
+
+    @classmethod
+    async def create(cls, db, name, init, **kwargs):
+        r"""
+        Create a table called `name` in the database `db`. See
+        :meth:`~dbtools.Table.create`.
+
+        Returns
+        -------
+        tbl : dbtools.aio.AsyncTable
+            Newly created AsyncTable object
+
+        """
+
+        executor = get_executor(db)
+        loop = asyncio.get_event_loop()
+        tbl = await loop.run_in_executor(executor, functools.partial(
+            _open, executor, Table.create, db, name, init, **kwargs))
+
+        self = cls.__new__(cls)
+        self.name = tbl.name
+        self._executor = executor
+        self._table = Future()
+        self._table.set_result(tbl)
+        return self
+
+    def _call(self, method, args, kwargs):
+        return getattr(self._table.result(), method)(*args, **kwargs)
+
+    def _run(self, method, *args, **kwargs):
+        r"""
+        Run a method of the underlying table on the executor thread.
+
+        """
+
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(
+            self._executor, self._call, method, args, kwargs)
+
+    def select(self, *args, **kwargs):
+        r"""Asynchronous :meth:`~dbtools.Table.select`."""
+        return self._run('select', *args, **kwargs)
+
+    def insert(self, *args, **kwargs):
+        r"""Asynchronous :meth:`~dbtools.Table.insert`."""
+        return self._run('insert', *args, **kwargs)
+
+    def upsert(self, *args, **kwargs):
+        r"""Asynchronous :meth:`~dbtools.Table.upsert`."""
+        return self._run('upsert', *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        r"""Asynchronous :meth:`~dbtools.Table.update`."""
+        return self._run('update', *args, **kwargs)
+
+    def update_many(self, *args, **kwargs):
+        r"""Asynchronous :meth:`~dbtools.Table.update_many`."""
+        return self._run('update_many', *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        r"""Asynchronous :meth:`~dbtools.Table.delete`."""
+        return self._run('delete', *args, **kwargs)
+
+    def delete_keys(self, *args, **kwargs):
+        r"""Asynchronous :meth:`~dbtools.Table.delete_keys`."""
+        return self._run('delete_keys', *args, **kwargs)
+
+    def iter_select(self, *args, **kwargs):
+        r"""
+        Asynchronous :meth:`~dbtools.Table.iter_select`, for use with
+        ``async for``. Each chunk is fetched on the executor thread.
+
+        """
+
+        return AsyncChunks(self, args, kwargs)
+
+    def __getitem__(self, key):
+        return self._run('__getitem__', key)
+
+    def __repr__(self):
+        return "AsyncTable(%r)" % self.name
+
+
+class AsyncChunks(object):
+    r"""
+    Asynchronous iterator over the chunks of a select, returned by
+    :meth:`~dbtools.aio.AsyncTable.iter_select`.
+
+    """
+
+    def __init__(self, table, args, kwargs):
+        self.table = table
+        self.args = args
+        self.kwargs = kwargs
+        self._chunks = None
+
+    def _next(self):
+        # the generator is created (and always resumed) on the
+        # executor thread
+        if self._chunks is None:
+            self._chunks = self.table._call(
+                'iter_select', self.args, self.kwargs)
+        return next(self._chunks, None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_event_loop()
+        chunk = await loop.run_in_executor(self.table._executor, self._next)
+        if chunk is None:
+            raise StopAsyncIteration
+        return chunk
@@ -0,0 +1,119 @@
+import threading
+
+from collections import OrderedDict
+
+from .util import sql_execute, connection_state
+from .where import temp_tables
+
+
+def data_version(conn, verbose=False):
+    r"""
+    Get a token that changes whenever the data or schema in the database
+    of `conn` may have changed: by a write on the connection itself
+    (``total_changes``), a commit by another connection (``PRAGMA
+    data_version``), or a schema change (``PRAGMA schema_version``).
+
+    """
+
+    # changes to the temporary tables of isin lists are not counted
+    version = [conn.total_changes - temp_tables(conn).changes]
+    for pragma in ("data_version", "schema_version"):
+        cmd = "PRAGMA %s" % pragma
+        version.append(
+            sql_execute(conn, cmd, fetchall=True, verbose=verbose)[0][0])
+    return tuple(version)
+
+
+class ResultCache(object):
+    r"""
+    Least-recently-used cache of query results (DataFrames).
+
+    Each result is stored together with the
+    :func:`~dbtools.cache.data_version` of the database at the time of
+    the query, and is only returned while the version is unchanged, so
+    that any write to the database invalidates it. Results are copied
+    when they are stored and when they are returned, so modifying them
+    does not affect the cache.
+
+    Parameters
+    ----------
+    maxbytes : int (default=64MB)
+        Maximum total memory usage of the cached DataFrames. The least
+        recently used results are discarded first, and results that are
+        larger than this are not cached.
+
+    """
+
+    def __init__(self, maxbytes=2 ** 26):
+        self.maxbytes = int(maxbytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # maps keys to (version, data, size), in order of least to most
+        # recently used
+        self._results = OrderedDict()
+
+    def get(self, key, version):
+        r"""
+        Get a copy of the result stored under `key`, or None if there
+        is none for the current `version`.
+
+        """
+
+        with self._lock:
+            entry = self._results.pop(key, None)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self.nbytes -= entry[2]
+                self.misses += 1
+                return None
+            self._results[key] = entry
+            self.hits += 1
+        return entry[1].copy()
+
+    def put(self, key, version, data):
+        r"""
+        Store a copy of the result `data` under `key`.
+
+        """
+
+        size = int(data.memory_usage(index=True, deep=True).sum())
+        if size > self.maxbytes:
+            return
+        data = data.copy()
+
+        with self._lock:
+            old = self._results.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            self._results[key] = (version, data, size)
+            self.nbytes += size
+            while self.nbytes > self.maxbytes:
+                key, (version, data, size) = self._results.popitem(
+                    last=False)
+                self.nbytes -= size
+
+    def clear(self):
+        r"""
+        Discard all cached results.
+
+        """
+
+        with self._lock:
+            self._results.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._results)
+
+
+def get_result_cache(conn):
+    r"""
+    Get the :class:`~dbtools.cache.ResultCache` shared by the tables on
+    the connection `conn`, which is created the first time it is needed
+    (see :func:`~dbtools.util.connection_state`).
+
+    """
+
+    return connection_state(conn, "result_cache", lambda conn: ResultCache())
@@ -0,0 +1,224 @@
+import re
+
+from collections import OrderedDict, namedtuple
+
+from .util import sql_execute, connection_state
+
+
+#: Description of a table column, from ``PRAGMA table_info``
+Column = namedtuple('Column', ['name', 'type', 'notnull', 'default', 'pk'])
+
+#: Description of an index, from ``PRAGMA index_list``
+Index = namedtuple('Index', ['name', 'columns', 'unique'])
+
+
+def quote(name):
+    r"""
+    Quote the identifier `name` for use in a SQL statement.
+
+    """
+
+    return '"%s"' % name.replace('"', '""')
+
+
+class Schema(object):
+    r"""
+    Description of the structure of a SQLite table.
+
+    Attributes
+    ----------
+    name : string
+        Name of the table.
+    sql : string
+        The ``CREATE TABLE`` statement of the table.
+    columns : tuple of :class:`~dbtools.catalog.Column`
+        The columns of the table, in order, with their declared type
+        (in upper case), ``NOT NULL`` constraint, default value (as SQL
+        text, or None), and position in the primary key (0 if the
+        column is not part of the primary key).
+    indexes : tuple of :class:`~dbtools.catalog.Index`
+        The indexes on the table, with the names of their columns and
+        whether they are unique.
+    primary_key : string or None
+        Name of the primary key column, if any. Tables with a primary
+        key of several columns are treated as having none (their
+        columns are listed by their ``pk`` positions in `columns`).
+    autoincrement : bool
+        Whether the primary key is ``AUTOINCREMENT``.
+
+    """
+
+    def __init__(self, name, sql, columns, indexes):
+        self.name = name
+        self.sql = sql
+        self.columns = tuple(columns)
+        self.indexes = tuple(indexes)
+
+        # parse primary key, if it is a single column
+        pk = [col.name for col in self.columns if col.pk > 0]
+        if len(pk) == 1:
+            self.primary_key = pk[0]
+        else:
+            self.primary_key = None
+
+        # only an INTEGER PRIMARY KEY can be AUTOINCREMENT
+        self.autoincrement = bool(
+            self.primary_key is not None and
+            re.search(r"\bAUTOINCREMENT\b", sql, re.IGNORECASE))
+
+    @property
+    def names(self):
+        r"""Names of the columns."""
+        return tuple([col.name for col in self.columns])
+
+    @property
+    def types(self):
+        r"""Declared types of the columns."""
+        return tuple([col.type for col in self.columns])
+
+    def __repr__(self):
+        # the statement will look like 'CREATE TABLE name(col1 TYPE,
+        # col2 TYPE, ...)'
+        args = self.sql[self.sql.index("(") + 1:self.sql.rindex(")")]
+        return "%s(%s)" % (self.name, args.strip())
+
+
+def read_schema(conn, name, sql, verbose=False):
+    r"""
+    Read the :class:`~dbtools.catalog.Schema` of the table `name` using
+    ``PRAGMA table_info`` and ``PRAGMA index_list``.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the SQLite database.
+    name : string
+        Name of the table.
+    sql : string
+        The ``CREATE TABLE`` statement of the table.
+    verbose : bool (optional)
+        Print out SQL command information.
+
+    Returns
+    -------
+    schema : dbtools.catalog.Schema
+
+    """
+
+    cmd = "PRAGMA table_info(%s)" % quote(name)
+    info = sql_execute(conn, cmd, fetchall=True, verbose=verbose)
+    columns = [Column(row[1], row[2].upper(), bool(row[3]), row[4], row[5])
+               for row in info]
+
+    cmd = "PRAGMA index_list(%s)" % quote(name)
+    info = sql_execute(conn, cmd, fetchall=True, verbose=verbose)
+    indexes = []
+    for row in info:
+        cmd = "PRAGMA index_info(%s)" % quote(row[1])
+        cols = sql_execute(conn, cmd, fetchall=True, verbose=verbose)
+        cols = tuple([col[2] for col in sorted(cols)])
+        indexes.append(Index(row[1], cols, bool(row[2])))
+
+    return Schema(name, sql, columns, indexes)
+
+
+class Catalog(object):
+    r"""
+    Cached view of the tables in a SQLite database.
+
+    The contents of ``sqlite_master`` are loaded once, and then reused
+    until the schema of the database changes. Changes are detected by
+    checking ``PRAGMA schema_version``, which SQLite increments whenever
+    the schema is modified (including by other connections), and the
+    catalog can also be invalidated explicitly.
+
+    Use :func:`~dbtools.catalog.get_catalog` to get the catalog of a
+    connection, rather than creating one directly.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the SQLite database.
+
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.version = None
+        self._tables = None
+        self._schemas = {}
+
+    def invalidate(self):
+        r"""
+        Discard the cached schema, so that it is reloaded on next use.
+
+        """
+
+        self.version = None
+        self._tables = None
+        self._schemas = {}
+
+    def _load(self, verbose=False):
+        r"""
+        Load the table definitions, unless the cached ones are still up
+        to date.
+
+        """
+
+        cmd = "PRAGMA schema_version"
+        version = sql_execute(
+            self.conn, cmd, fetchall=True, verbose=verbose)[0][0]
+        if self._tables is not None and version == self.version:
+            return self._tables
+
+        cmd = "SELECT name, sql FROM sqlite_master WHERE type='table'"
+        result = sql_execute(self.conn, cmd, fetchall=True, verbose=verbose)
+        self._tables = OrderedDict(result)
+        self._schemas = {}
+        self.version = version
+        return self._tables
+
+    def tables(self, verbose=False):
+        r"""
+        Get the list of tables in the database.
+
+        """
+
+        return list(self._load(verbose=verbose).keys())
+
+    def exists(self, name, verbose=False):
+        r"""
+        Check if a table called `name` exists in the database.
+
+        """
+
+        return name in self._load(verbose=verbose)
+
+    def schema(self, name, verbose=False):
+        r"""
+        Get the :class:`~dbtools.catalog.Schema` of the table `name`.
+        The schema is only read the first time this is called for each
+        table (or after the database schema changes).
+
+        """
+
+        tables = self._load(verbose=verbose)
+        if name not in tables:
+            raise ValueError("no such table: %s" % name)
+        if name not in self._schemas:
+            self._schemas[name] = read_schema(
+                self.conn, name, tables[name], verbose=verbose)
+        return self._schemas[name]
+
+
+def get_catalog(conn):
+    r"""
+    Get the :class:`~dbtools.catalog.Catalog` of the connection `conn`.
+
+    The catalog is stored with the connection (see
+    :func:`~dbtools.util.connection_state`), so it is shared by all
+    tables using the same connection.
+
+    """
+
+    return connection_state(conn, "catalog", Catalog)
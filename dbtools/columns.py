@@ -0,0 +1,139 @@
+import json
+import numpy as np
+import os
+
+from collections import OrderedDict
+
+from .util import string_types
+
+#: Name of the JSON file describing the columns in a directory
+SCHEMA_FILE = "schema.json"
+
+
+def _to_storable(arr, sqltype):
+    r"""
+    Convert a column fetched by :func:`~dbtools.util.sql_fetch_arrays`
+    into an array that can be saved (and memory-mapped) without
+    pickling, if possible.
+
+    Returns
+    -------
+    out : tuple
+        2-tuple of (data array, mask array or None). The mask is True
+        where the value is ``NULL``.
+
+    """
+
+    if arr.dtype.kind == 'f':
+        mask = np.isnan(arr)
+        if sqltype == 'INTEGER':
+            # integers with NULL values were fetched as floats
+            data = np.where(mask, 0, arr).astype(np.int64)
+            return data, mask
+        return arr, None
+
+    elif arr.dtype.kind != 'O':
+        return arr, None
+
+    mask = np.array([x is None for x in arr], dtype=bool)
+    values = [x for x in arr if x is not None]
+    if all(isinstance(x, string_types) for x in values):
+        data = np.array([x if x is not None else "" for x in arr],
+                        dtype=np.str_)
+    else:
+        # e.g. blobs, or text mixed with other types
+        data = arr
+    return data, (mask if mask.any() else None)
+
+
+def write_columns(path, info, arrays):
+    r"""
+    Write columns of data to the directory `path`, as one NumPy ``.npy``
+    file per column, with a JSON description of the columns in
+    ``schema.json``.
+
+    Parameters
+    ----------
+    path : string
+        Path to the directory (which is created if needed).
+    info : dict
+        Description of the table. Must include 'columns' and 'types'
+        (the names and declared types of the columns), and may include
+        anything else that can be stored as JSON.
+    arrays : list of numpy.ndarray
+        The column data, as returned by
+        :func:`~dbtools.util.sql_fetch_arrays`.
+
+    """
+
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    columns = []
+    for i, (name, sqltype, arr) in enumerate(
+            zip(info['columns'], info['types'], arrays)):
+        data, mask = _to_storable(arr, sqltype)
+        col = {
+            'name': name,
+            'type': sqltype,
+            'file': "column_%d.npy" % i,
+            'mask': None,
+            'pickled': data.dtype.kind == 'O',
+        }
+        np.save(os.path.join(path, col['file']), data)
+        if mask is not None:
+            col['mask'] = "column_%d.mask.npy" % i
+            np.save(os.path.join(path, col['mask']), mask)
+        columns.append(col)
+
+    schema = dict(info)
+    schema['columns'] = columns
+    schema.pop('types')
+    schema['rows'] = len(arrays[0]) if len(arrays) > 0 else 0
+    with open(os.path.join(path, SCHEMA_FILE), 'w') as fh:
+        json.dump(schema, fh, indent=2)
+
+
+def read_columns(path, mmap=True):
+    r"""
+    Read columns of data written by
+    :func:`~dbtools.columns.write_columns` (or
+    :meth:`~dbtools.Table.save_columns`).
+
+    Parameters
+    ----------
+    path : string
+        Path to the directory.
+    mmap : bool (default=True)
+        Memory-map the column files (read-only), rather than reading
+        them into memory. Columns of Python objects (e.g. blobs) are
+        always read into memory.
+
+    Returns
+    -------
+    schema : dict
+        The description of the columns, from ``schema.json``.
+    arrays : OrderedDict
+        Maps column names to arrays. Columns with ``NULL`` values are
+        returned as masked arrays (where the mask is True for ``NULL``).
+
+    """
+
+    with open(os.path.join(path, SCHEMA_FILE)) as fh:
+        schema = json.load(fh)
+
+    mmap_mode = 'r' if mmap else None
+    arrays = OrderedDict()
+    for col in schema['columns']:
+        filename = os.path.join(path, col['file'])
+        if col['pickled']:
+            data = np.load(filename, allow_pickle=True)
+        else:
+            data = np.load(filename, mmap_mode=mmap_mode)
+        if col['mask'] is not None:
+            mask = np.load(os.path.join(path, col['mask']),
+                           mmap_mode=mmap_mode)
+            data = np.ma.MaskedArray(data, mask=mask)
+        arrays[col['name']] = data
+
+    return schema, arrays
@@ -0,0 +1,258 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+
+from .profiles import apply_profile
+from .util import string_types
+
+try:
+    from urllib.request import pathname2url
+except ImportError:  # pragma: no cover
+    from urllib import pathname2url
+
+#: Settings for read-only connections: memory-map up to 1GB of the
+#: database file, and use a 64MB page cache
+readonly_pragmas = OrderedDict([
+    ('mmap_size', 2 ** 30),
+    ('cache_size', -65536),
+    ('query_only', 'ON'),
+])
+
+
+class Connection(sqlite3.Connection):
+    r"""
+    A `sqlite3.Connection` that is opened by dbtools.
+
+    Unlike plain `sqlite3.Connection` objects, instances of this class
+    can hold attributes, which dbtools uses to keep per-connection state.
+
+    """
+
+    pass
+
+
+def _file_id(path, readonly=False):
+    r"""
+    Get an identifier for the file at `path`, so that we can tell if
+    it has been deleted or replaced. Returns None if there is no file.
+
+    Read-only connections are opened as immutable, so SQLite does not
+    notice changes to the file itself. For them, the identifier also
+    includes the size and modification time of the file, so that they
+    are not reused after it has been written to.
+
+    """
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if readonly:
+        mtime = getattr(st, 'st_mtime_ns', st.st_mtime)
+        return (st.st_dev, st.st_ino, st.st_size, mtime)
+    return (st.st_dev, st.st_ino)
+
+
+class ConnectionPool(object):
+    r"""
+    A cache of SQLite connections, keyed by database path and thread.
+
+    Connections made through the pool are reused for the same database
+    path in the same thread (SQLite connections cannot be shared across
+    threads by default). In-memory databases are never cached, as every
+    connection to ``:memory:`` is a different database.
+
+    At most `size` connections are kept, and the least recently used
+    connections are released first. Connections that have not been
+    requested for `idle_timeout` seconds are released as well. Released
+    connections are closed once nothing else (e.g. a
+    :class:`~dbtools.Table`) refers to them any more.
+
+    The pool can be used as a context manager, in which case
+    :meth:`~dbtools.ConnectionPool.close` is called on exit::
+
+        with ConnectionPool() as pool:
+            tbl = Table(pool.connect("data.db"), "People")
+
+    Parameters
+    ----------
+    size : int (default=16)
+        Maximum number of cached connections.
+    idle_timeout : float (default=300)
+        Number of seconds after which an unused connection is released.
+        If None, connections are only released when the pool is full.
+
+    """
+
+    def __init__(self, size=16, idle_timeout=300.0):
+        self.size = int(size)
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        # maps (path, thread, readonly) to (connection, file id, last used time),
+        # in order of least to most recently used
+        self._connections = OrderedDict()
+
+    def _open(self, path, readonly=False):
+        r"""
+        Open a new connection to the database at `path`.
+
+        Read-only connections are opened with a ``mode=ro&immutable=1``
+        URI, so that SQLite does no locking or change detection on the
+        file, and are set up with
+        :data:`~dbtools.connection.readonly_pragmas`. Python versions
+        before 3.4 do not support URIs, so there read-only connections
+        are opened normally, and only made read-only by the pragmas.
+
+        """
+
+        if not readonly:
+            return sqlite3.connect(path, factory=Connection)
+
+        if sys.version_info < (3, 4):
+            # URIs are not supported, so we can only make the
+            # connection read-only with PRAGMA query_only
+            conn = sqlite3.connect(path, factory=Connection)
+        else:
+            uri = "file:%s?mode=ro&immutable=1" % pathname2url(
+                os.path.abspath(path))
+            conn = sqlite3.connect(uri, factory=Connection, uri=True)
+        for pragma, value in readonly_pragmas.items():
+            conn.execute("PRAGMA %s=%s" % (pragma, value))
+        return conn
+
+    def _evict(self, now):
+        r"""
+        Release connections that have been idle for too long, and the
+        least recently used connections if there are too many.
+
+        """
+
+        if self.idle_timeout is not None:
+            for key, (conn, fid, used) in list(self._connections.items()):
+                if (now - used) > self.idle_timeout:
+                    del self._connections[key]
+
+        while len(self._connections) > self.size:
+            self._connections.popitem(last=False)
+
+    def connect(self, path, readonly=False):
+        r"""
+        Get a connection to the SQLite database at `path`.
+
+        Parameters
+        ----------
+        path : string
+            Path to the SQLite database.
+        readonly : bool (default=False)
+            Open the database as read-only and immutable, for querying
+            large files that are not modified while they are open (see
+            :meth:`~dbtools.connection.ConnectionPool._open`). Read-only
+            and read-write connections are cached separately.
+
+        Returns
+        -------
+        conn : dbtools.connection.Connection
+            A (possibly cached) connection to the database.
+
+        """
+
+        if path in ("", ":memory:"):
+            if readonly:
+                raise ValueError("in-memory databases cannot be read-only")
+            return self._open(path)
+
+        readonly = bool(readonly)
+        key = (os.path.abspath(path), threading.current_thread().ident,
+               readonly)
+        with self._lock:
+            now = time.time()
+            self._evict(now)
+            entry = self._connections.pop(key, None)
+            # don't reuse connections to files that have been deleted
+            # or replaced since the connection was opened
+            if (entry is not None and
+                    entry[1] == _file_id(path, readonly=readonly)):
+                conn = entry[0]
+            else:
+                conn = self._open(path, readonly=readonly)
+            self._connections[key] = (
+                conn, _file_id(path, readonly=readonly), now)
+            self._evict(now)
+
+        return conn
+
+    def close(self):
+        r"""
+        Close all connections in the pool.
+
+        Connections belonging to the current thread are closed
+        immediately, and connections belonging to other threads (which
+        SQLite does not allow us to close here) are released.
+
+        """
+
+        ident = threading.current_thread().ident
+        with self._lock:
+            connections = list(self._connections.items())
+            self._connections.clear()
+
+        for (path, thread, readonly), (conn, fid, used) in connections:
+            if thread == ident:
+                conn.close()
+
+    def __len__(self):
+        return len(self._connections)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+#: The pool used by :class:`~dbtools.Table` when it is given a path
+default_pool = ConnectionPool()
+
+
+def connect(db, readonly=False, profile=None):
+    r"""
+    Get a connection to the database `db`.
+
+    Parameters
+    ----------
+    db : string or sqlite3.Connection
+        Path to the SQLite database, or a connection to the database. If
+        a path is given, the connection comes from
+        :data:`~dbtools.connection.default_pool`.
+    readonly : bool (default=False)
+        Open the database as read-only (see
+        :meth:`~dbtools.connection.ConnectionPool.connect`). This is
+        only used if a path is given.
+    profile : string or dict (optional)
+        Apply this profile of PRAGMA settings to the connection (see
+        :data:`~dbtools.profiles.profiles`). The settings stay in effect
+        for as long as the connection is used; use
+        :class:`~dbtools.profiles.Profile` to apply them temporarily. If
+        a path is given, a new connection is opened outside of the pool,
+        so that the settings do not affect other users of the pool.
+
+    Returns
+    -------
+    conn : sqlite3.Connection
+        Connection to the database.
+
+    """
+
+    if isinstance(db, string_types):
+        if profile is None:
+            return default_pool.connect(db, readonly=readonly)
+        if readonly and db in ("", ":memory:"):
+            raise ValueError("in-memory databases cannot be read-only")
+        db = default_pool._open(db, readonly=readonly)
+    if profile is not None:
+        apply_profile(db, profile)
+    return db
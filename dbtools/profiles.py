@@ -0,0 +1,140 @@
+from collections import OrderedDict
+
+from .util import sql_execute, string_types
+
+
+#: Named collections of PRAGMA settings, which can be applied to a
+#: connection with :func:`~dbtools.profiles.apply_profile` or
+#: :class:`~dbtools.profiles.Profile`.
+#:
+#: * ``"safe"`` -- SQLite's defaults: a rollback journal, and a full
+#:   sync to disk on every commit.
+#: * ``"wal_concurrent"`` -- write-ahead logging, so that readers do not
+#:   block the writer (or vice versa), syncing only at checkpoints. A
+#:   crash cannot corrupt the database, but may lose the last commits.
+#: * ``"bulk_load"`` -- no syncing and an in-memory journal, with a large
+#:   page cache, for loading data as fast as possible. A crash (of the
+#:   process or of the machine) during the load can corrupt the
+#:   database, so only use this for databases that can be rebuilt.
+profiles = {
+    'safe': OrderedDict([
+        ('journal_mode', 'DELETE'),
+        ('synchronous', 'FULL'),
+        ('cache_size', -2000),
+        ('temp_store', 'DEFAULT'),
+        ('mmap_size', 0),
+    ]),
+    'wal_concurrent': OrderedDict([
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -65536),
+        ('temp_store', 'MEMORY'),
+        ('mmap_size', 2 ** 28),
+    ]),
+    'bulk_load': OrderedDict([
+        ('journal_mode', 'MEMORY'),
+        ('synchronous', 'OFF'),
+        ('cache_size', -262144),
+        ('temp_store', 'MEMORY'),
+        ('mmap_size', 2 ** 28),
+    ]),
+}
+
+
+def get_profile(profile):
+    r"""
+    Look up the PRAGMA settings of `profile`, which is either the name
+    of one of the :data:`~dbtools.profiles.profiles`, or a dictionary
+    mapping PRAGMA names to values.
+
+    """
+
+    if isinstance(profile, string_types):
+        if profile not in profiles:
+            raise ValueError("no such profile: %s" % profile)
+        return profiles[profile]
+    return OrderedDict(profile)
+
+
+def get_pragmas(conn, names, verbose=False):
+    r"""
+    Get the current values of the PRAGMAs `names` on the connection
+    `conn`, as an OrderedDict.
+
+    """
+
+    values = OrderedDict()
+    for name in names:
+        cmd = "PRAGMA %s" % name
+        values[name] = sql_execute(
+            conn, cmd, fetchall=True, verbose=verbose)[0][0]
+    return values
+
+
+def set_pragmas(conn, pragmas, verbose=False):
+    r"""
+    Set the PRAGMAs in the dictionary `pragmas` on the connection `conn`.
+
+    Note that SQLite does not allow the journal mode to be changed in
+    the middle of a transaction.
+
+    """
+
+    for name, value in pragmas.items():
+        cmd = "PRAGMA %s=%s" % (name, value)
+        sql_execute(conn, cmd, fetchall=True, verbose=verbose)
+
+
+def apply_profile(conn, profile, verbose=False):
+    r"""
+    Apply `profile` (see :func:`~dbtools.profiles.get_profile`) to the
+    connection `conn`.
+
+    Returns
+    -------
+    previous : OrderedDict
+        The settings that were replaced, which can be passed to
+        :func:`~dbtools.profiles.set_pragmas` to restore them.
+
+    """
+
+    pragmas = get_profile(profile)
+    previous = get_pragmas(conn, pragmas.keys(), verbose=verbose)
+    set_pragmas(conn, pragmas, verbose=verbose)
+    return previous
+
+
+class Profile(object):
+    r"""
+    Context manager that applies a profile of PRAGMA settings to a
+    connection, and restores the previous settings on exit::
+
+        with Profile(conn, "bulk_load"):
+            tbl.insert(data)
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the SQLite database.
+    profile : string or dict
+        Name of the profile, or a dictionary of PRAGMA settings (see
+        :func:`~dbtools.profiles.get_profile`).
+    verbose : bool (optional)
+        Print out SQL command information.
+
+    """
+
+    def __init__(self, conn, profile, verbose=False):
+        self.conn = conn
+        self.pragmas = get_profile(profile)
+        self.verbose = verbose
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = apply_profile(
+            self.conn, self.pragmas, verbose=self.verbose)
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        set_pragmas(self.conn, self.previous, verbose=self.verbose)
+        self.previous = None
@@ -1,16 +1,44 @@
+import csv
+import json
+import multiprocessing
 import numpy as np
 import pandas as pd
-import re
 import os
 import sqlite3
-
-from .util import sql_execute, dict_to_dtypes, int_types, string_types, blob_type
+import time
+
+from itertools import chain, islice
+
+from .advisor import where_columns
+from .cache import get_result_cache, data_version
+from .catalog import get_catalog
+from .columns import SCHEMA_FILE, write_columns, read_columns
+from .connection import connect, default_pool
+from .profiles import Profile
+from .transaction import transaction, commit_context, get_transaction
+from .util import sql_execute, sql_iterate, sql_fetch_arrays, rows_to_arrays
+from .util import dict_to_dtypes, frame_to_columns, to_sql_column, izip
+from .util import sql_dtypes, max_variables, read_csv_chunks, open_csv
+from .util import int_types, string_types, blob_type
+from .where import Condition, And, as_condition, compile_where, col
+from .where import temp_values
 
 try:
     xrange
 except NameError:
     xrange = range
 
+#: SQL for the aggregation functions of :meth:`~dbtools.Table.aggregate`
+#: that SQLite computes directly
+aggregates = {
+    'count': "COUNT(%s)",
+    'sum': "COALESCE(SUM(%s),0)",
+    'mean': "AVG(%s)",
+    'min': "MIN(%s)",
+    'max': "MAX(%s)",
+}
+
+
 class Table(object):
 
     @classmethod
@@ -36,15 +64,10 @@ class Table(object):
             # if the database doesn't exist, throw an error
             if not os.path.exists(db):
                 raise ValueError("no such database: %s" % db)
-            db = sqlite3.connect(db)
-
-        # select the names of all tables in the database
-        cmd = "SELECT name FROM sqlite_master WHERE type='table'"
-        result = sql_execute(db, cmd, fetchall=True, verbose=verbose)
+            db = connect(db)
 
-        # try to match `name` to one of the table names
-        tables = [table[0] for table in result]
-        return tables
+        # get the names of all tables in the database
+        return get_catalog(db).tables(verbose=verbose)
 
     @classmethod
     def exists(cls, db, name, verbose=False):
@@ -71,21 +94,14 @@ class Table(object):
             # if the database doesn't exist, neither does the table
             if not os.path.exists(db):
                 return False
-            db = sqlite3.connect(db)
-
-        # select the names of all tables in the database
-        cmd = "SELECT name FROM sqlite_master WHERE type='table'"
-        result = sql_execute(db, cmd, fetchall=True, verbose=verbose)
+            db = connect(db)
 
         # try to match `name` to one of the table names
-        for table in result:
-            if name == table[0]:
-                return True
-        return False
+        return get_catalog(db).exists(name, verbose=verbose)
 
     @classmethod
     def create(cls, db, name, init, primary_key=None,
-               autoincrement=False, verbose=False):
+               autoincrement=False, verbose=False, profile=None):
         r"""
         Create a table called `name` in the database `db`.
 
@@ -103,7 +119,8 @@ class Table(object):
 
                The column names of the DataFrame will be used as column
                names in the table, and the datatype of each column will
-               be inferred by the first row of data in the DataFrame.
+               be inferred from the column's dtype (or, for object
+               columns, from the first non-null value).
 
                If the DataFrame has an index name, a primary key column
                will be created (it will also be ``AUTOINCREMENT`` if
@@ -111,7 +128,9 @@ class Table(object):
                be the index of the DataFrame.
 
                The corresponding values for the other columns will be
-               the DataFrame's actual matrix data.
+               the DataFrame's actual data. Each column is converted
+               once, and rows are streamed into the table without
+               building an intermediate list of rows.
 
         3. `init` is a dictionary or list of dictionaries.
 
@@ -145,6 +164,11 @@ class Table(object):
             Set the primary key column to automatically increment.
         verbose : bool (optional)
             Print out SQL command information.
+        profile : string or dict (optional)
+            Profile of PRAGMA settings (e.g. ``"bulk_load"``) to use
+            while creating the table and inserting the data. The
+            previous settings are restored afterwards. See
+            :data:`~dbtools.profiles.profiles`.
 
         Returns
         -------
@@ -162,20 +186,18 @@ class Table(object):
                 if primary_key is not None and primary_key != idx.name:
                     raise ValueError("primary key mismatch")
                 primary_key = idx.name
-            # extract the data and column names
-            data = [list(init.as_matrix()[i]) for i in xrange(len(init))]
-            names = list(init.columns)
-            if idx.name is not None:
-                for i in xrange(len(init)):
-                    data[i].insert(0, idx[i])
-                names.insert(0, primary_key)
-            # parse data types
-            d = dict(zip(names, data[0]))
-            dtypes = dict_to_dtypes(d, order=names)
-            # coerce data with the data types we just extracted
-            data = [[dtypes[i][1](x[i]) for i in xrange(len(x))] for x in data]
+            # convert each column (and the index, if it is named) into
+            # native python values all at once
+            names, types, columns = frame_to_columns(init)
+            for label, dtype in zip(names, types):
+                if dtype is None:
+                    raise ValueError("could not determine datatype "
+                                     "of column '%s'" % label)
+            dtypes = list(zip(names, types))
+            # lazily zip the columns into rows
+            data = izip(*columns)
             # insert primary key column, if requested
-            if primary_key is not None and primary_key not in list(zip(*dtypes))[0]:
+            if primary_key is not None and primary_key not in names:
                 dtypes.insert(0, (primary_key, int))
 
         elif hasattr(init, 'keys') or (
@@ -185,10 +207,11 @@ class Table(object):
             if hasattr(init, 'keys'):
                 init = [init]
             dtypes = dict_to_dtypes(init)
+            names = [col for col, dtype in dtypes]
             data = [[dtype(init[i][col]) for col, dtype in dtypes]
                     for i in xrange(len(init))]
             # insert primary key column, if requested
-            if primary_key is not None and primary_key not in list(zip(*dtypes))[0]:
+            if primary_key is not None and primary_key not in names:
                 dtypes.insert(0, (primary_key, int))
 
         else:
@@ -225,21 +248,25 @@ class Table(object):
             args.append(arg)
 
         # connect to the database and create the table
-        if isinstance(db, string_types):
-            db = sqlite3.connect(db)
-        cmd = "CREATE TABLE %s(%s)" % (name, ', '.join(args))
-        sql_execute(db, cmd, verbose=verbose)
+        db = connect(db)
+        if profile is None:
+            profile = {}
+        with Profile(db, profile, verbose=verbose):
+            cmd = "CREATE TABLE %s(%s)" % (name, ', '.join(args))
+            sql_execute(db, cmd, verbose=verbose)
+            get_catalog(db).invalidate()
 
-        # create a Table object
-        tbl = cls(db, name, verbose=verbose)
+            # create a Table object
+            tbl = cls(db, name, verbose=verbose)
 
-        # insert data, if it was given
-        if data is not None:
-            tbl.insert(values=data)
+            # insert data, if it was given
+            if data is not None:
+                tbl._insert_rows(names, data)
 
         return tbl
 
-    def __init__(self, db, name, verbose=False):
+    def __init__(self, db, name, verbose=False, readonly=False,
+                 profile=None, cache=False, advisor=None):
         r"""
         Creates a frame-like interface to the SQLite table `name` in the
         database `db`.
@@ -248,19 +275,44 @@ class Table(object):
         ----------
         db : string or sqlite3.Connection
             The path to the SQLite database, or a connection to the database.
+            Connections to paths are shared through
+            :data:`~dbtools.connection.default_pool`.
         name : (string)
             The name of the table in the database.
         verbose : bool (default=False)
             Print out SQL command information.
+        readonly : bool (default=False)
+            If `db` is a path, open it read-only, with memory-mapped I/O
+            and without file locking (see
+            :meth:`~dbtools.connection.ConnectionPool.connect`). This is
+            much faster for many concurrent readers, but the database
+            must not be modified while it is open.
+        profile : string or dict (optional)
+            Apply this profile of PRAGMA settings to the connection (see
+            :data:`~dbtools.profiles.profiles`). If `db` is a path, the
+            table gets its own connection, which is not shared through
+            the pool. Use :meth:`~dbtools.Table.profile` to apply a
+            profile temporarily.
+        cache : bool (default=False)
+            Cache the results of :meth:`~dbtools.Table.select` (and
+            thus indexing) in the :class:`~dbtools.cache.ResultCache`
+            of the connection, so that repeating a query returns a copy
+            of the previous result until the database changes.
+        advisor : dbtools.advisor.IndexAdvisor (optional)
+            Record the columns used by selects in the advisor, to
+            suggest indexes.
 
         """
 
         # save the parameters
-        if isinstance(db, string_types):
-            db = sqlite3.connect(db)
-        self.db = db
+        self.db = connect(db, readonly=readonly, profile=profile)
         self.name = str(name)
         self.verbose = bool(verbose)
+        if cache:
+            self.cache = get_result_cache(self.db)
+        else:
+            self.cache = None
+        self.advisor = advisor
 
         if not self.exists(self.db, self.name, self.verbose):
             raise ValueError(
@@ -268,44 +320,37 @@ class Table(object):
                 "**  If you were trying to create a new table, please\n"
                 "**  use `Table.create` instead." % name)
 
-        # query the database for information about the table
-        cmd = ("SELECT sql FROM sqlite_master "
-               "WHERE tbl_name='%s' and type='table'" % name)
-        info = sql_execute(self.db, cmd, fetchall=True, verbose=verbose)
-
-        # parse the response -- it will look like 'CREATE TABLE
-        # name(col1 TYPE, col2 TYPE, ...)'
-        args = re.match("([^\(]*)\((.*)\)", info[0][0]).groups()[1]
-
-        # compute repr string
-        self.repr = "%s(%s)" % (self.name, args)
-
-        # get the column names
-        cols = [a.strip() for a in args.split(",")]
-        self.columns = tuple([x.split(" ")[0] for x in cols])
-
-        # parse primary key, if any
-        pk = [bool(re.search(r"PRIMARY KEY", x)) for x in cols]
-        primary_key = np.nonzero(pk)[0]
-        if len(primary_key) > 1:
-            raise ValueError("more than one primary key: %s" % primary_key)
-        elif len(primary_key) == 1:
-            self.primary_key = self.columns[primary_key[0]]
-        else:
-            self.primary_key = None
-
-        # parse autoincrement, if applicable
-        ai = [bool(re.search(r"AUTOINCREMENT", x)) for x in cols]
-        autoincrement = np.nonzero(ai)[0]
-        if len(autoincrement) > 1:
-            raise ValueError("more than one autoincrementing "
-                             "column: %s" % autoincrement)
-        elif self.primary_key is not None and len(autoincrement) == 1:
-            if self.primary_key != self.columns[autoincrement[0]]:
-                raise ValueError("autoincrement is different from primary key")
-            self.autoincrement = True
-        else:
-            self.autoincrement = False
+        # look up information about the table
+        schema = self.schema
+        self.repr = repr(schema)
+        self.columns = schema.names
+        self.types = schema.types
+        self.primary_key = schema.primary_key
+        self.autoincrement = schema.autoincrement
+
+    @property
+    def schema(self):
+        r"""
+        The :class:`~dbtools.catalog.Schema` of the table, describing
+        its columns (names, declared types, ``NOT NULL``, defaults and
+        primary key) and indexes. The schema is cached in the
+        connection's catalog, and re-read if the database schema
+        changes.
+
+        """
+
+        return get_catalog(self.db).schema(self.name, verbose=self.verbose)
+
+    @property
+    def indexes(self):
+        r"""
+        The indexes on the table, as a tuple of
+        :class:`~dbtools.catalog.Index` (with the name of the index, the
+        names of its columns, and whether it is unique).
+
+        """
+
+        return self.schema.indexes
 
     def _where(self, args):
         r"""
@@ -324,9 +369,16 @@ class Table(object):
             self._where("age=?", 25)
             self._where("age=? OR name=?", (25, "Ben Bitdiddle"))
 
+        `args` can also be a dictionary or a condition built with
+        :func:`~dbtools.where.col`, which is compiled with
+        :func:`~dbtools.where.compile_where`::
+
+            self._where({'age': 25, 'height': ('>', 1.7)})
+            self._where((col('age') == 25) | col('name').isin(names))
+
         Parameters
         ----------
-        args : string or (string, value) or (string, (value1, value2, ...))
+        args : string or (string, value) or (string, (value1, value2, ...)) or dict or dbtools.where.Condition
             Conditional for the ``WHERE`` statement (see above).
 
         Returns
@@ -337,7 +389,11 @@ class Table(object):
         """
 
         # add a selection filter, if specified
-        if args is not None:
+        if isinstance(args, (dict, Condition)):
+            where_str, where_args = compile_where(
+                args, self.db, verbose=self.verbose)
+            out = (" WHERE %s" % where_str, where_args)
+        elif args is not None:
             if isinstance(args, string_types):
                 args = (args, None)
             where_str, where_args = args
@@ -353,6 +409,63 @@ class Table(object):
 
         return out
 
+    def profile(self, profile):
+        r"""
+        Use a profile of PRAGMA settings (see
+        :data:`~dbtools.profiles.profiles`) for a block of code, and
+        restore the previous settings afterwards::
+
+            with tbl.profile("bulk_load"):
+                tbl.insert(data)
+
+        Parameters
+        ----------
+        profile : string or dict
+            Name of the profile, or a dictionary of PRAGMA settings.
+
+        Returns
+        -------
+        profile : dbtools.profiles.Profile
+            Context manager applying the profile.
+
+        """
+
+        return Profile(self.db, profile, verbose=self.verbose)
+
+    def batch(self, flush_every=None, flush_interval=None):
+        r"""
+        Group writes to the table's database into a single transaction.
+
+        Inside the ``with`` block, calls to
+        :meth:`~dbtools.Table.insert`, :meth:`~dbtools.Table.update`
+        and :meth:`~dbtools.Table.delete` (on this or any other table
+        using the same connection) are not committed one by one, but
+        all together when the block ends::
+
+            with tbl.batch():
+                for trial in trials:
+                    tbl.insert(trial)
+
+        If an exception is raised in the block, the uncommitted changes
+        are rolled back. See :func:`~dbtools.transaction.transaction`.
+
+        Parameters
+        ----------
+        flush_every : int (optional)
+            Commit after this many writing statements.
+        flush_interval : float (optional)
+            Commit after this many seconds.
+
+        Returns
+        -------
+        txn : dbtools.transaction.Transaction
+            The transaction, to be used as a context manager.
+
+        """
+
+        return transaction(
+            self.db, flush_every=flush_every, flush_interval=flush_interval)
+
     def drop(self):
         r"""
         Drop the table from its database.
@@ -365,14 +478,79 @@ class Table(object):
 
         cmd = "DROP TABLE %s" % self.name
         sql_execute(self.db, cmd, verbose=self.verbose)
+        get_catalog(self.db).invalidate()
 
-    def insert(self, values=None):
+    def create_index(self, columns, unique=False, name=None):
+        r"""
+        Create an index on the table, unless it already exists.
+
+        Parameters
+        ----------
+        columns : string or list of strings
+            The column or columns to index.
+        unique : bool (default=False)
+            Create a ``UNIQUE`` index.
+        name : string (optional)
+            Name of the index. By default, the name is made from the
+            table and column names, e.g. ``Foo_name_age_idx``.
+
+        Returns
+        -------
+        name : string
+            The name of the index.
+
+        """
+
+        if isinstance(columns, string_types):
+            columns = [columns]
+        columns = list(columns)
+        if len(columns) == 0:
+            raise ValueError("no columns to index")
+        for col in columns:
+            if col not in self.columns:
+                raise ValueError("no such column: %s" % col)
+        if name is None:
+            name = "%s_%s_idx" % (self.name, "_".join(columns))
+
+        cmd = "CREATE %sINDEX IF NOT EXISTS %s ON %s(%s)" % (
+            "UNIQUE " if unique else "", name, self.name, ",".join(columns))
+        sql_execute(self.db, cmd, verbose=self.verbose)
+        get_catalog(self.db).invalidate()
+        return name
+
+    def drop_index(self, name):
+        r"""
+        Drop an index from the table.
+
+        Parameters
+        ----------
+        name : string or list of strings
+            The name of the index, or the columns of the index (as a
+            list, even if there is only one column).
+
+        """
+
+        if not isinstance(name, string_types):
+            columns = tuple(name)
+            names = [idx.name for idx in self.indexes
+                     if idx.columns == columns]
+            if len(names) == 0:
+                raise ValueError("no index on columns: %s" % (columns,))
+            name = names[0]
+        elif name not in [idx.name for idx in self.indexes]:
+            raise ValueError("no such index: %s" % name)
+
+        cmd = "DROP INDEX %s" % name
+        sql_execute(self.db, cmd, verbose=self.verbose)
+        get_catalog(self.db).invalidate()
+
+    def insert(self, values=None, chunksize=None):
         r"""
         Insert values into the table.
 
-        The `values` parameter should be a list of non-string sequences
-        (or a single sequence, which will then be encased in a
-        list). Each sequence is handled as follows:
+        The `values` parameter should be an iterable of non-string
+        sequences (or a single sequence, which will then be encased in
+        a list). Each sequence is handled as follows:
 
             * If the sequence is a dictionary, then the keys should
               correspond to column names and the values should match the
@@ -386,83 +564,314 @@ class Table(object):
         value should be excluded from every sequence as it will be
         filled in automatically.
 
+        Data can also be given by column, as a pandas DataFrame, a numpy
+        structured array, or a dictionary mapping column names to
+        arrays. Each column is then converted all at once, rather than
+        row by row. For a DataFrame, the index is inserted too if its
+        name is a column of the table (e.g. the primary key, as in the
+        output of :meth:`~dbtools.Table.select`).
+
+        The iterable can be a generator, in which case the rows are
+        only read as they are inserted, so memory use does not grow
+        with the number of rows. By default, all of the rows are
+        inserted in one transaction. If `chunksize` is given, then the
+        rows are inserted (and committed) `chunksize` at a time instead.
+
+        Parameters
+        ----------
+        values : iterable, list, tuple, dict, or pandas.DataFrame
+            The values to insert (see above).
+        chunksize : int (optional)
+            Number of rows to insert per transaction.
+
         """
 
-        # argument parsing -- `values` should be a list of sequences
+        cols, entries = self._normalize(values)
+
+        # perform the insertion
+        if chunksize is None:
+            self._insert_rows(cols, entries)
+        else:
+            if chunksize < 1:
+                raise ValueError("invalid chunksize: %s" % chunksize)
+            while True:
+                chunk = list(islice(entries, chunksize))
+                if len(chunk) == 0:
+                    break
+                self._insert_rows(cols, chunk)
+
+    def _normalize(self, values):
+        r"""
+        Helper function to parse the values passed to
+        :meth:`~dbtools.Table.insert`.
+
+        Returns
+        -------
+        out : tuple
+            2-tuple of (column names, iterator over row tuples). The
+            rows are converted lazily, as the iterator is consumed.
+
+        """
+
+        # columnar data is converted a whole column at a time
+        columns = self._columnar(values)
+        if columns is not None:
+            return columns
+
+        # argument parsing -- `values` should be an iterable of
+        # sequences (only sequences can be a single row, as we can't
+        # look ahead in other iterables)
         if values is None:
             values = {}
         if hasattr(values, 'keys') or not hasattr(values, "__iter__"):
             values = [values]
-        elif (not hasattr(values[0], "__iter__")) or isinstance(values[0], string_types):
+        elif hasattr(values, "__getitem__") and len(values) > 0 and (
+                (not hasattr(values[0], "__iter__")) or
+                isinstance(values[0], string_types)):
             values = [values]
 
-        if not hasattr(values[0], "__iter__"):
+        # look at the first row, to figure out the columns
+        rows = iter(values)
+        cols = list(self.columns)
+        try:
+            first = next(rows)
+        except StopIteration:
+            return cols, iter([])
+        if not hasattr(first, "__iter__"):
             raise ValueError(
-                "expected dict or list/tuple, got: %s" % type(values[0]))
+                "expected dict or list/tuple, got: %s" % type(first))
 
         # if we're not trying to insert a value for the primary key,
         # exclude it from the column list
-        cols = list(self.columns)
-        if len(values[0]) == (len(cols) - 1) and self.primary_key is not None:
+        if len(first) == (len(cols) - 1) and self.primary_key is not None:
             cols.remove(self.primary_key)
         ncol = len(cols)
 
         # extract the entries from the values that were given
-        entries = []
-        for vals in values:
-            if hasattr(vals, 'keys'):
-                entry = tuple([vals.get(key, None) for key in cols])
-            elif hasattr(vals, "__iter__"):
-                if len(vals) != ncol:
-                    raise ValueError("expected %d values, got %d" % (
-                        ncol, len(vals)))
-                entry = tuple(vals)
-            else:
-                raise ValueError(
-                    "expected dict or list/tuple, got: %s" % type(vals))
+        def entries():
+            for vals in chain([first], rows):
+                if hasattr(vals, 'keys'):
+                    entry = tuple([vals.get(key, None) for key in cols])
+                elif hasattr(vals, "__iter__"):
+                    if len(vals) != ncol:
+                        raise ValueError("expected %d values, got %d" % (
+                            ncol, len(vals)))
+                    entry = tuple(vals)
+                else:
+                    raise ValueError(
+                        "expected dict or list/tuple, got: %s" % type(vals))
+
+                yield entry
+
+        return cols, entries()
+
+    def _columnar(self, values):
+        r"""
+        Helper function to convert columnar values passed to
+        :meth:`~dbtools.Table.insert`, i.e. a pandas DataFrame, a numpy
+        structured array, or a dictionary of arrays.
+
+        Each column is converted with
+        :func:`~dbtools.util.to_sql_column`, and the columns are put in
+        the same order as in the table.
+
+        Returns
+        -------
+        out : tuple or None
+            2-tuple of (column names, iterator over row tuples), or None
+            if `values` is not columnar.
+
+        """
+
+        if isinstance(values, pd.DataFrame):
+            names, dtypes, columns = frame_to_columns(values)
+            # only use the index if it is a column of the table
+            if (values.index.name is not None and
+                    values.index.name not in self.columns):
+                names, columns = names[1:], columns[1:]
+            data = dict(zip(names, columns))
+
+        elif isinstance(values, np.ndarray) and values.dtype.names:
+            names = list(values.dtype.names)
+            data = dict([(name, to_sql_column(values[name])[1])
+                         for name in names])
+
+        elif hasattr(values, 'keys') and len(values) > 0 and all(
+                hasattr(v, '__len__') and
+                not isinstance(v, string_types + (blob_type,))
+                for v in values.values()):
+            names = list(values.keys())
+            data = {}
+            for name in names:
+                try:
+                    data[name] = to_sql_column(values[name])[1]
+                except ValueError:
+                    # there is no data in this column
+                    data[name] = [None] * len(values[name])
+
+        else:
+            return None
 
-            entries.append(entry)
+        unknown = [name for name in names if name not in self.columns]
+        if len(unknown) > 0:
+            raise ValueError("no such column(s): %s" % ", ".join(
+                [str(name) for name in unknown]))
+        if len(set(len(col) for col in data.values())) > 1:
+            raise ValueError("columns have different lengths")
+
+        cols = [col for col in self.columns if col in data]
+        return cols, izip(*[data[col] for col in cols])
+
+    def upsert(self, values, conflict_columns=None, update_columns=None):
+        r"""
+        Insert values into the table, updating the rows that already
+        exist.
+
+        The `values` are given as for :meth:`~dbtools.Table.insert`. A
+        row "already exists" if it has the same values in the
+        `conflict_columns` as an existing row. These columns must have a
+        ``PRIMARY KEY`` or ``UNIQUE`` constraint (or a unique index).
+        Instead of inserting such rows, the `update_columns` of the
+        existing row are set to the new values.
+
+        All of the rows are handled by a single ``INSERT ... ON CONFLICT
+        DO UPDATE`` statement, executed once per row in one
+        transaction. This requires SQLite 3.24 or later.
+
+        Parameters
+        ----------
+        values : list, tuple, or dict
+            See :meth:`~dbtools.Table.insert`.
+        conflict_columns : string or list of strings (optional)
+            The columns that identify a row. Defaults to the primary
+            key.
+        update_columns : string or list of strings (optional)
+            The columns to update in existing rows. Defaults to all of
+            the inserted columns, except the `conflict_columns`. If
+            empty, existing rows are left unchanged.
+
+        """
+
+        if sqlite3.sqlite_version_info < (3, 24, 0):
+            raise RuntimeError(
+                "upsert requires SQLite 3.24 or later, found %s" % (
+                    sqlite3.sqlite_version))
+
+        if conflict_columns is None:
+            if self.primary_key is None:
+                raise ValueError("no primary key column")
+            conflict_columns = [self.primary_key]
+        elif isinstance(conflict_columns, string_types):
+            conflict_columns = [conflict_columns]
+
+        cols, entries = self._normalize(values)
+
+        if update_columns is None:
+            update_columns = [c for c in cols if c not in conflict_columns]
+        elif isinstance(update_columns, string_types):
+            update_columns = [update_columns]
+
+        if len(update_columns) > 0:
+            action = "UPDATE SET %s" % ", ".join([
+                "%s=excluded.%s" % (col, col) for col in update_columns])
+        else:
+            action = "NOTHING"
+        conflict = " ON CONFLICT(%s) DO %s" % (
+            ", ".join(conflict_columns), action)
+
+        self._insert_rows(cols, entries, suffix=conflict)
+
+    def _insert_rows(self, cols, rows, suffix=""):
+        r"""
+        Insert rows into the columns `cols` of the table.
+
+        Parameters
+        ----------
+        cols : list of strings
+            Names of the columns that are being inserted.
+        rows : iterable
+            Sequences of values, one per row, in the same order as
+            `cols`. This may be any iterable (e.g. a generator), and it
+            is consumed lazily by ``executemany``.
+        suffix : string (optional)
+            Extra SQL to append to the ``INSERT`` statement, e.g. an
+            ``ON CONFLICT`` clause.
+
+        """
 
         # target string of NULL and question marks
-        qm = ["?"]*ncol
+        qm = ["?"]*len(cols)
         qm = ", ".join(qm)
         c = ", ".join(cols)
 
         # perform the insertion
-        cmd = ("INSERT INTO %s(%s) VALUES (%s)" % (
-            self.name, c, qm))
-        with self.db:
-            self.db.executemany(cmd, entries)
+        cmd = ("INSERT INTO %s(%s) VALUES (%s)%s" % (
+            self.name, c, qm, suffix))
+        with commit_context(self.db):
+            self.db.executemany(cmd, rows)
 
-    def select(self, columns=None, where=None):
+    def _order_by(self, order_by):
         r"""
-        Select data from the table.
+        Helper function to build an ``ORDER BY`` clause.
 
         Parameters
         ----------
-        columns : (default=None)
-            The column names to select. If None, all columns are
-            selected. Can be either a single value (string) or a list of
-            strings.
+        order_by : string or list of strings
+            The column(s) to sort by. Column names starting with ``-``
+            are sorted in descending order.
 
-        where : (default=None)
-            Additional filtering to perform on the data akin to the
-            ``WHERE`` SQL statement, e.g.::
+        Returns
+        -------
+        out : string
+            The ``ORDER BY`` clause, or an empty string if `order_by`
+            is None.
 
-                where="age=25"
+        """
 
-            If you need to pass in variable arguments, use question
-            marks, e.g.::
+        if order_by is None:
+            return ""
+        if isinstance(order_by, string_types):
+            order_by = [order_by]
 
-                where=("age=?", 25)
-                where=("age=? OR name=?", (25, "Ben Bitdiddle"))
+        terms = []
+        for column in order_by:
+            if column.startswith("-"):
+                column, order = column[1:], " DESC"
+            else:
+                order = ""
+            if column not in self.columns and column != "rowid":
+                raise ValueError("no such column: %s" % column)
+            terms.append(column + order)
+        if len(terms) == 0:
+            return ""
+        return " ORDER BY %s" % ",".join(terms)
+
+    def _select_query(self, columns=None, where=None, order_by=None,
+                      limit=None, offset=None):
+        r"""
+        Helper function to build a ``SELECT`` statement.
+
+        Parameters
+        ----------
+        columns : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        where : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        order_by : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        limit : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        offset : (default=None)
+            See :meth:`~dbtools.Table.select`.
 
         Returns
         -------
-        data : pandas.DataFrame
-            A pandas DataFrame containing the queried data. Column names
-            correspond to the table column names, and if there is a
-            primary key column, it will be used as the index.
+        out : tuple
+            4-tuple of (command, column names, index column name,
+            ``WHERE`` clause). The command can be passed to
+            :func:`~dbtools.util.sql_execute`, the index column is None
+            if there is no primary key, and the ``WHERE`` clause is an
+            empty string if there is no condition.
 
         """
 
@@ -485,24 +894,591 @@ class Table(object):
         query = "SELECT %s FROM %s" % (sel, self.name)
         where_str, where_args = self._where(where)
         query += where_str
+        query += self._order_by(order_by)
+        if limit is not None or offset is not None:
+            # a negative limit means no limit
+            query += " LIMIT %d" % (-1 if limit is None else int(limit))
+            if offset is not None:
+                query += " OFFSET %d" % int(offset)
         cmd = [query]
         if len(where_args) > 0:
             cmd.append(where_args)
 
-        # connect to the database and execute the query
-        rows = sql_execute(self.db, cmd, fetchall=True, verbose=self.verbose)
-
-        # now we need to parse the result into a DataFrame
+        # the primary key is used as the index
         if self.primary_key in cols:
             index = self.primary_key
         else:
             index = None
+
+        return cmd, cols, index, where_str
+
+    def select(self, columns=None, where=None, chunksize=None,
+               order_by=None, limit=None, offset=None):
+        r"""
+        Select data from the table.
+
+        Parameters
+        ----------
+        columns : (default=None)
+            The column names to select. If None, all columns are
+            selected. Can be either a single value (string) or a list of
+            strings.
+
+        where : (default=None)
+            Additional filtering to perform on the data akin to the
+            ``WHERE`` SQL statement, e.g.::
+
+                where="age=25"
+
+            If you need to pass in variable arguments, use question
+            marks, e.g.::
+
+                where=("age=?", 25)
+                where=("age=? OR name=?", (25, "Ben Bitdiddle"))
+
+            Conditions can also be given as a dictionary, or built from
+            columns with :func:`~dbtools.where.col`, e.g.::
+
+                where={'age': 25, 'height': ('>', 1.7)}
+                where=(col('age') == 25) | col('name').isin(names)
+
+            These are compiled to parameterized SQL that is always the
+            same for the same condition, so the prepared statement can
+            be reused (see :func:`~dbtools.where.compile_where`).
+
+        chunksize : int (default=None)
+            If given, return an iterator over DataFrames of at most
+            `chunksize` rows instead of a single DataFrame (see
+            :meth:`~dbtools.Table.iter_select`).
+
+        order_by : (default=None)
+            The column name (or list of column names) to sort the rows
+            by. Names starting with ``-`` are sorted in descending
+            order, e.g.::
+
+                order_by=['-age', 'name']
+
+        limit : int (default=None)
+            Maximum number of rows to select.
+
+        offset : int (default=None)
+            Number of rows to skip. To page through a large table, use
+            :meth:`~dbtools.Table.pages` instead, which does not need to
+            skip over the earlier pages for every page.
+
+        Returns
+        -------
+        data : pandas.DataFrame
+            A pandas DataFrame containing the queried data. Column names
+            correspond to the table column names, and if there is a
+            primary key column, it will be used as the index.
+
+        """
+
+        if chunksize is not None:
+            return self.iter_select(
+                columns=columns, where=where, chunksize=chunksize,
+                order_by=order_by, limit=limit, offset=offset)
+
+        cmd, cols, index, where_str = self._select_query(
+            columns, where, order_by=order_by, limit=limit, offset=offset)
+        if self.cache is None:
+            return self._select(cmd, cols, index, where_str)
+
+        # the SQL and its arguments (including the values of long isin
+        # lists) identify the result
+        key = (cmd[0], tuple(cmd[1]) if len(cmd) > 1 else (),
+               temp_values(self.db, cmd[0]))
+        try:
+            hash(key)
+        except TypeError:
+            return self._select(cmd, cols, index, where_str)
+
+        version = data_version(self.db, verbose=self.verbose)
+        data = self.cache.get(key, version)
+        if data is None:
+            data = self._select(cmd, cols, index, where_str)
+            self.cache.put(key, version, data)
+        return data
+
+    def _select(self, cmd, cols, index, where_str=""):
+        r"""
+        Run a query built by :meth:`~dbtools.Table._select_query` (and
+        record its ``WHERE`` clause in the index advisor, if there is
+        one).
+
+        """
+
+        if self.advisor is None or where_str == "":
+            return self._fetch(cmd, cols, index)
+
+        start = time.time()
+        data = self._fetch(cmd, cols, index)
+        seconds = time.time() - start
+        self.advisor.record(
+            self.db, self.name, cmd, where_columns(where_str, self.columns),
+            seconds, verbose=self.verbose)
+        return data
+
+    def _fetch(self, cmd, cols, index):
+        r"""
+        Run a query built by :meth:`~dbtools.Table._select_query`, and
+        return the result as a DataFrame.
+
+        """
+
+        # numeric data can be fetched straight into typed arrays
+        if self._is_numeric(cols):
+            arrays = sql_fetch_arrays(
+                self.db, cmd, self._types(cols), verbose=self.verbose)
+            return self._frame_from_arrays(arrays, cols, index)
+
+        # connect to the database and execute the query
+        rows = sql_execute(self.db, cmd, fetchall=True, verbose=self.verbose)
+
+        # now we need to parse the result into a DataFrame
         data = pd.DataFrame.from_records(
             rows, columns=cols, index=index,
             coerce_float=True)
 
         return data
 
+    def iter_select(self, columns=None, where=None, chunksize=10000,
+                    order_by=None, limit=None, offset=None):
+        r"""
+        Select data from the table, one chunk of rows at a time.
+
+        This is like :meth:`~dbtools.Table.select`, except that rows
+        are fetched from the database lazily, so only one chunk is held
+        in memory at a time. For example::
+
+            for chunk in table.iter_select(where="age>24", chunksize=100):
+                print(chunk['height'].mean())
+
+        Parameters
+        ----------
+        columns : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        where : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        chunksize : int (default=10000)
+            Maximum number of rows in each DataFrame.
+        order_by : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        limit : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        offset : (default=None)
+            See :meth:`~dbtools.Table.select`.
+
+        Yields
+        ------
+        data : pandas.DataFrame
+            A pandas DataFrame containing the next chunk of queried
+            data, formatted like the output of
+            :meth:`~dbtools.Table.select`.
+
+        """
+
+        cmd, cols, index, where_str = self._select_query(
+            columns, where, order_by=order_by, limit=limit, offset=offset)
+        chunks = sql_iterate(
+            self.db, cmd, chunksize, verbose=self.verbose)
+
+        numeric = self._is_numeric(cols)
+        types = self._types(cols)
+
+        # without a primary key, number the rows across chunks so that
+        # the chunks concatenate to the output of `select`
+        start = 0
+        for rows in chunks:
+            if index is None:
+                idx = np.arange(start, start + len(rows))
+                start += len(rows)
+            else:
+                idx = index
+            if numeric:
+                arrays = rows_to_arrays(rows, types)
+                yield self._frame_from_arrays(arrays, cols, idx)
+            else:
+                yield pd.DataFrame.from_records(
+                    rows, columns=cols, index=idx,
+                    coerce_float=True)
+
+    def pages(self, page_size=1000, columns=None, where=None,
+              order_by=None):
+        r"""
+        Select data from the table one page at a time, using keyset
+        pagination.
+
+        Each page is selected with ``WHERE key > last`` (where ``last``
+        is the largest key on the previous page) and a ``LIMIT``, rather
+        than with an ``OFFSET``, so that getting a page takes the same
+        time no matter how deep it is (if the key is indexed, like the
+        primary key). Unlike :meth:`~dbtools.Table.iter_select`, no
+        cursor is kept open between pages. For example::
+
+            for page in table.pages(100, where="age>24"):
+                show(page)
+
+        Parameters
+        ----------
+        page_size : int (default=1000)
+            Maximum number of rows in each page.
+        columns : (default=None)
+            See :meth:`~dbtools.Table.select`. The `order_by` column is
+            always selected.
+        where : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        order_by : string (default=None)
+            The column to page by, which must have unique values, and no
+            ``NULL`` values among the selected rows. Use a name starting
+            with ``-`` to page in descending order. If None, the primary
+            key is used.
+
+        Yields
+        ------
+        data : pandas.DataFrame
+            The next page of data, formatted like the output of
+            :meth:`~dbtools.Table.select`.
+
+        """
+
+        if page_size < 1:
+            raise ValueError("invalid page size: %s" % page_size)
+        if order_by is None:
+            if self.primary_key is None:
+                raise ValueError("no primary key column to page by")
+            order_by = self.primary_key
+        if order_by.startswith("-"):
+            key, descending = order_by[1:], True
+        else:
+            key, descending = order_by, False
+        if key not in self.columns:
+            raise ValueError("no such column: %s" % key)
+
+        if columns is not None:
+            if isinstance(columns, string_types):
+                columns = [columns]
+            columns = list(columns)
+            if key not in columns:
+                columns.append(key)
+
+        # NULL keys cannot be compared with the last key of a page, so
+        # they would be left out or repeated
+        cond = [col(key).isnull()]
+        if where is not None:
+            cond.insert(0, as_condition(where))
+        where_str, where_args = self._where(And(*cond))
+        cmd = ["SELECT 1 FROM %s%s LIMIT 1" % (self.name, where_str)]
+        if len(where_args) > 0:
+            cmd.append(where_args)
+        if sql_execute(self.db, cmd, fetchall=True, verbose=self.verbose):
+            raise ValueError("cannot page by %s, which has NULL values" % key)
+
+        last = None
+        while True:
+            cond = where
+            if last is not None:
+                after = col(key) < last if descending else col(key) > last
+                if where is None:
+                    cond = after
+                else:
+                    cond = And(as_condition(where), after)
+            page = self.select(
+                columns=columns, where=cond, order_by=order_by,
+                limit=page_size)
+            if len(page) > 0:
+                yield page
+            if len(page) < page_size:
+                break
+
+            if key == self.primary_key:
+                last = page.index[-1]
+            else:
+                last = page[key].iloc[-1]
+            # numpy scalars cannot be passed to SQLite
+            if isinstance(last, np.generic):
+                last = last.item()
+
+    def parallel_select(self, columns=None, where=None, partitions=None):
+        r"""
+        Select data from the table using several processes.
+
+        The range of the primary key (or of the ``rowid``, if there is
+        no ``INTEGER`` primary key) is split into `partitions` ranges of
+        equal width, each range is selected by a separate process with
+        its own read-only connection to the database, and the results
+        are concatenated. For large tables, this can be much faster than
+        :meth:`~dbtools.Table.select`, as both the query and the
+        construction of the DataFrames run in parallel.
+
+        The table must be stored in a file, which must not be modified
+        while the select is running. It cannot be used in a
+        :meth:`~dbtools.Table.batch`, as the other processes would not
+        see the uncommitted changes.
+
+        Parameters
+        ----------
+        columns : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        where : (default=None)
+            See :meth:`~dbtools.Table.select`.
+        partitions : int (default=None)
+            Number of partitions (and processes). If None, the number
+            of CPUs is used.
+
+        Returns
+        -------
+        data : pandas.DataFrame
+            The queried data, as returned by
+            :meth:`~dbtools.Table.select`.
+
+        """
+
+        if partitions is None:
+            partitions = multiprocessing.cpu_count()
+        if partitions < 1:
+            raise ValueError("invalid number of partitions: %s" % partitions)
+
+        # find the file the table is stored in
+        cmd = "PRAGMA database_list"
+        dbs = sql_execute(self.db, cmd, fetchall=True, verbose=self.verbose)
+        path = dict((row[1], row[2]) for row in dbs).get('main', '')
+        if path == '':
+            raise ValueError("parallel_select needs a database file")
+        # the workers' read-only connections cannot see uncommitted rows
+        if get_transaction(self.db) is not None:
+            raise ValueError("parallel_select cannot be used in a batch")
+
+        # only integer keys can be split into ranges
+        key = self.primary_key
+        if key is None or self.types[self.columns.index(key)] != "INTEGER":
+            key = "rowid"
+        cmd = "SELECT MIN(%s), MAX(%s) FROM %s" % (key, key, self.name)
+        lo, hi = sql_execute(
+            self.db, cmd, fetchall=True, verbose=self.verbose)[0]
+        if lo is None or partitions == 1:
+            return self.select(columns=columns, where=where)
+
+        # changes that are still in the write-ahead log are not seen by
+        # read-only (immutable) connections
+        cmd = "PRAGMA wal_checkpoint"
+        sql_execute(self.db, cmd, fetchall=True, verbose=self.verbose)
+
+        # split [lo, hi] into ranges of (nearly) equal width
+        step = -(-(hi - lo + 1) // partitions)
+        tasks = []
+        for start in xrange(lo, hi + 1, step):
+            cond = (col(key) >= start) & (col(key) < start + step)
+            if where is not None:
+                cond = And(as_condition(where), cond)
+            tasks.append((path, self.name, columns, cond))
+
+        pool = multiprocessing.Pool(len(tasks))
+        try:
+            frames = pool.map(_select_partition, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+        # without a primary key, number the rows like `select`
+        return pd.concat(frames, ignore_index=self.primary_key is None)
+
+    def aggregate(self, by=None, agg=None, where=None):
+        r"""
+        Compute aggregate values of columns in SQLite, optionally per
+        group of rows, like a pandas ``groupby(...).agg(...)`` on the
+        output of :meth:`~dbtools.Table.select`, but without fetching
+        every row. For example::
+
+            table.aggregate(by='subject', agg={'rt': ['mean', 'count']})
+
+        As in pandas, rows where any of the `by` columns is ``NULL`` are
+        left out, and the groups are sorted.
+
+        Parameters
+        ----------
+        by : string or list of strings (default=None)
+            The column(s) to group by. If None, the whole table (or the
+            rows selected by `where`) is aggregated into one row.
+        agg : dict
+            Maps column names to the name of an aggregation function,
+            or a list of names. The functions are 'count' (of non-null
+            values), 'sum', 'mean', 'min', 'max', 'var' and 'std' (the
+            sample variance and standard deviation).
+        where : (default=None)
+            See :meth:`~dbtools.Table.select`.
+
+        Returns
+        -------
+        data : pandas.DataFrame
+            The aggregated data, indexed by the `by` columns. If every
+            value in `agg` is a single function, the columns are named
+            after the aggregated columns; otherwise, the columns are a
+            MultiIndex of (column, function), as in pandas.
+
+        """
+
+        if by is None:
+            by = []
+        elif isinstance(by, string_types):
+            by = [by]
+        else:
+            by = list(by)
+        if not agg:
+            raise ValueError("no aggregation functions given")
+
+        # expressions to select, after the group columns
+        exprs = []
+
+        def expr(sql):
+            if sql not in exprs:
+                exprs.append(sql)
+            return len(by) + exprs.index(sql)
+
+        # variances are computed from the deviations from the mean of
+        # each group, which is selected in a subquery, as sums of squares
+        # of the values themselves lose all precision when the variance
+        # is small compared to the mean (and overflow for integers)
+        means = []
+
+        outputs = []
+        flat = True
+        for column, funcs in agg.items():
+            if column not in self.columns:
+                raise ValueError("no such column: %s" % column)
+            if isinstance(funcs, string_types):
+                funcs = [funcs]
+            else:
+                flat = False
+            for func in funcs:
+                if func in aggregates:
+                    parts = (expr(aggregates[func] % column),)
+                elif func in ('var', 'std'):
+                    if column not in means:
+                        means.append(column)
+                    dev = "(CAST(%s AS REAL)-_dbtools_mean_%d)" % (
+                        column, means.index(column))
+                    parts = (expr("TOTAL(%s)" % dev),
+                             expr("TOTAL(%s*%s)" % (dev, dev)),
+                             expr("COUNT(%s)" % column))
+                else:
+                    raise ValueError(
+                        "invalid aggregation function: %s" % func)
+                outputs.append((column, func, parts))
+        for column in by:
+            if column not in self.columns:
+                raise ValueError("no such column: %s" % column)
+
+        # like pandas, leave out groups with missing keys
+        cond = [col(column).notnull() for column in by]
+        if where is not None:
+            cond.insert(0, as_condition(where))
+        where_str, where_args = self._where(And(*cond) if cond else None)
+        group = ",".join(by)
+
+        source = self.name
+        args = where_args
+        if len(means) > 0:
+            sel = ",".join(by + [
+                "AVG(%s) AS _dbtools_mean_%d" % (column, i)
+                for i, column in enumerate(means)])
+            sub = "SELECT %s FROM %s%s" % (sel, self.name, where_str)
+            if len(by) > 0:
+                sub += " GROUP BY %s" % group
+                source = "%s JOIN (%s) AS _dbtools_means USING (%s)" % (
+                    self.name, sub, group)
+            else:
+                source = "%s, (%s) AS _dbtools_means" % (self.name, sub)
+            # the subquery comes first, and has the same arguments
+            args = where_args + where_args
+
+        query = "SELECT %s FROM %s%s" % (
+            ",".join(by + exprs), source, where_str)
+        if len(by) > 0:
+            query += " GROUP BY %s ORDER BY %s" % (group, group)
+        cmd = [query]
+        if len(args) > 0:
+            cmd.append(args)
+        rows = sql_execute(self.db, cmd, fetchall=True, verbose=self.verbose)
+        result = pd.DataFrame.from_records(
+            rows, columns=list(range(len(by) + len(exprs))),
+            coerce_float=True)
+
+        data = pd.DataFrame(index=result.index)
+        for column, func, parts in outputs:
+            if func in ('var', 'std'):
+                total, squares, n = [
+                    result[i].astype(float) for i in parts]
+                # the deviations only add up to (nearly) zero
+                var = (squares - total * total / n) / (n - 1)
+                var = var.where(n > 1).clip(lower=0)
+                values = np.sqrt(var) if func == 'std' else var
+            else:
+                values = result[parts[0]]
+            key = column if flat else (column, func)
+            data[key] = values
+
+        if not flat:
+            data.columns = pd.MultiIndex.from_tuples(data.columns)
+        if len(by) > 0:
+            data.index = pd.MultiIndex.from_arrays(
+                [result[i] for i in range(len(by))], names=by)
+            if len(by) == 1:
+                data.index = data.index.get_level_values(0)
+        return data
+
+    def _types(self, cols):
+        r"""
+        Get the declared types of the columns `cols`.
+
+        """
+
+        types = dict(zip(self.columns, self.types))
+        return [types.get(col, "") for col in cols]
+
+    def _is_numeric(self, cols):
+        r"""
+        Check whether the columns `cols` can all be fetched into typed
+        numeric arrays (i.e., they are distinct ``INTEGER`` or ``REAL``
+        columns).
+
+        """
+
+        if len(set(cols)) != len(cols):
+            return False
+        return all(t in sql_dtypes for t in self._types(cols))
+
+    def _frame_from_arrays(self, arrays, cols, index):
+        r"""
+        Build a DataFrame from one array per column in `cols`.
+
+        Parameters
+        ----------
+        arrays : list of numpy.ndarray
+            The column data.
+        cols : list of strings
+            The column names.
+        index : string, array-like, or None
+            Name of the column to use as the index, or the index
+            values themselves.
+
+        Returns
+        -------
+        data : pandas.DataFrame
+            A DataFrame formatted like the output of
+            :meth:`~dbtools.Table.select`.
+
+        """
+
+        data = dict(zip(cols, arrays))
+        if isinstance(index, string_types):
+            names = [col for col in cols if col != index]
+            index = pd.Index(data.pop(index), name=index)
+        else:
+            names = cols
+        return pd.DataFrame(data, columns=names, index=index)
+
     def __getitem__(self, key):
         r"""
         Select data from the table.
@@ -598,6 +1574,9 @@ class Table(object):
                 where=("age=?", 25)
                 where=("age=? OR name=?", (25, "Ben Bitdiddle"))
 
+            Dictionaries and conditions are accepted as well (see
+            :meth:`~dbtools.Table.select`).
+
         """
 
         if not hasattr(values, 'keys'):
@@ -619,6 +1598,77 @@ class Table(object):
         # connect to the database and execute the update
         sql_execute(self.db, cmd, verbose=self.verbose)
 
+    def update_many(self, values, key=None):
+        r"""
+        Update many rows in the table, each with its own values.
+
+        All of the rows are updated with a single prepared ``UPDATE``
+        statement, which is executed once per row in one transaction.
+
+        Parameters
+        ----------
+        values : pandas.DataFrame, dict, or list of dicts
+            The new values. If a DataFrame is given, its columns are
+            the columns to update, and the rows are matched by its
+            index (so the output of :meth:`~dbtools.Table.select` can
+            be modified and passed back in). Otherwise, each dictionary
+            should map column names to new values, and must include the
+            `key` column to match its row.
+
+        key : string (optional)
+            Name of the column used to match rows. Defaults to the
+            primary key.
+
+        """
+
+        if key is None:
+            key = self.primary_key
+        if key is None:
+            raise ValueError("no primary key column")
+        if key not in self.columns:
+            raise ValueError("no such column: %s" % key)
+
+        if isinstance(values, pd.DataFrame):
+            if key in values.columns:
+                values = values.set_index(key)
+            elif values.index.name is None:
+                values = values.copy()
+                values.index.name = key
+            elif values.index.name != key:
+                raise ValueError(
+                    "index name mismatch: %s" % values.index.name)
+            # move the key to the end, to match the statement
+            names, dtypes, columns = frame_to_columns(values)
+            cols = names[1:]
+            rows = izip(*(columns[1:] + columns[:1]))
+
+        else:
+            if hasattr(values, 'keys'):
+                values = [values]
+            if len(values) == 0:
+                return
+            cols = sorted(k for k in values[0].keys() if k != key)
+            names = set(cols + [key])
+            for vals in values:
+                if set(vals.keys()) != names:
+                    raise ValueError(
+                        "expected keys %s, got %s" % (
+                            sorted(names), sorted(vals.keys())))
+            rows = (tuple([vals[col] for col in cols]) + (vals[key],)
+                    for vals in values)
+
+        if len(cols) == 0:
+            raise ValueError("no columns to update")
+
+        update = "UPDATE %s SET %s WHERE %s=?" % (
+            self.name, ", ".join(["%s=?" % col for col in cols]), key)
+        if self.verbose:
+            print(update)
+
+        # executemany runs in a single transaction
+        with commit_context(self.db):
+            self.db.executemany(update, rows)
+
     def delete(self, where=None):
         r"""
         Delete rows from the table.
@@ -637,6 +1687,9 @@ class Table(object):
                 where=("age=?", 25)
                 where=("age=? OR name=?", (25, "Ben Bitdiddle"))
 
+            Dictionaries and conditions are accepted as well (see
+            :meth:`~dbtools.Table.select`).
+
             NOTE: If `where` is `None`, then ALL rows will be deleted!
 
         """
@@ -654,7 +1707,189 @@ class Table(object):
         # connect to the database and execute the update
         sql_execute(self.db, cmd, verbose=self.verbose)
 
-    def save_csv(self, path, columns=None, where=None):
+    def delete_keys(self, keys, key=None):
+        r"""
+        Delete the rows with the given keys from the table.
+
+        The keys are deleted with ``DELETE ... WHERE key IN (...)``
+        statements, in chunks small enough to stay within SQLite's limit
+        on the number of parameters, and all in one transaction.
+
+        Parameters
+        ----------
+        keys : iterable
+            The values of `key` of the rows to delete.
+        key : string (optional)
+            Name of the column to match. Defaults to the primary key.
+
+        Returns
+        -------
+        count : int
+            The number of rows that were deleted.
+
+        """
+
+        if key is None:
+            key = self.primary_key
+        if key is None:
+            raise ValueError("no primary key column")
+        if key not in self.columns:
+            raise ValueError("no such column: %s" % key)
+
+        # convert numpy values to ones that sqlite understands
+        keys = list(keys)
+        if len(keys) == 0:
+            return 0
+        dtype, keys = to_sql_column(keys)
+
+        count = 0
+        with transaction(self.db):
+            for i in xrange(0, len(keys), max_variables):
+                chunk = keys[i:i + max_variables]
+                delete = "DELETE FROM %s WHERE %s IN (%s)" % (
+                    self.name, key, ", ".join(["?"] * len(chunk)))
+                if self.verbose:
+                    print(delete)
+                with commit_context(self.db):
+                    count += self.db.execute(delete, chunk).rowcount
+
+        return count
+
+    @staticmethod
+    def _csv_chunks(path, chunksize, dtypes, kwargs):
+        r"""
+        Helper function to read a CSV file for
+        :meth:`~dbtools.Table.load_csv` in chunks (see
+        :func:`~dbtools.util.read_csv_chunks`).
+
+        If the first column of the header is empty (as written by
+        :meth:`~dbtools.Table.save_csv` for tables without a primary
+        key), it is used as the index, so that it is not inserted.
+
+        """
+
+        kwargs = dict(kwargs)
+        if 'index_col' not in kwargs:
+            # let pandas read the header, so that compressed files work
+            header = pd.read_csv(path, nrows=0, **kwargs).columns
+            if len(header) > 0 and str(header[0]).startswith("Unnamed: 0"):
+                kwargs['index_col'] = 0
+        if dtypes is not None:
+            kwargs['dtype'] = dict(dtypes)
+        return read_csv_chunks(path, chunksize, **kwargs)
+
+    def load_csv(self, path, chunksize=10000, dtypes=None, **kwargs):
+        r"""
+        Insert the contents of a CSV text file into the table.
+
+        The file is read `chunksize` rows at a time, and each chunk is
+        inserted (and committed) with :meth:`~dbtools.Table.insert`.
+        The next chunk is parsed on a background thread while the
+        current one is being inserted. Column names are taken from the
+        header of the file, so files written by
+        :meth:`~dbtools.Table.save_csv` can be loaded back in.
+
+        Parameters
+        ----------
+        path : string
+            Path to the csv file.
+        chunksize : int (default=10000)
+            Number of rows to parse and insert at a time.
+        dtypes : list of 2-tuples (optional)
+            Data types to parse the columns as, in the form (column
+            name, data type), e.g. to keep ``'007'`` as a string.
+        kwargs :
+            Extra keyword arguments for `pandas.read_csv`.
+
+        Returns
+        -------
+        count : int
+            The number of rows that were inserted.
+
+        """
+
+        count = 0
+        for chunk in self._csv_chunks(path, chunksize, dtypes, kwargs):
+            self.insert(chunk)
+            count += len(chunk)
+        return count
+
+    @classmethod
+    def create_from_csv(cls, db, name, path, primary_key=None,
+                        autoincrement=False, chunksize=10000,
+                        dtypes=None, verbose=False, **kwargs):
+        r"""
+        Create a table called `name` in the database `db` from the
+        contents of a CSV text file.
+
+        Unless `dtypes` is given, the data type of each column is
+        inferred (with :func:`~dbtools.util.dict_to_dtypes`) from the
+        first chunk of the file. The data is then inserted as in
+        :meth:`~dbtools.Table.load_csv`.
+
+        Parameters
+        ----------
+        db : string or sqlite3.Connection
+            Path to the SQLite database, or a connection to the database.
+        name : string
+            Name of the desired table.
+        path : string
+            Path to the csv file.
+        primary_key : string (optional)
+            Name of the primary key column. If it is not a column of
+            the file, a new primary key column is created, and its
+            values are filled in automatically.
+        autoincrement : bool (optional)
+            Set the primary key column to automatically increment.
+        chunksize : int (default=10000)
+            Number of rows to parse and insert at a time.
+        dtypes : list of 2-tuples (optional)
+            Names and data types of the columns, as for
+            :meth:`~dbtools.Table.create`.
+        verbose : bool (optional)
+            Print out SQL command information.
+        kwargs :
+            Extra keyword arguments for `pandas.read_csv`.
+
+        Returns
+        -------
+        tbl : dbtools.Table
+            Newly created Table object
+
+        """
+
+        chunks = cls._csv_chunks(path, chunksize, dtypes, kwargs)
+        first = next(chunks, None)
+
+        if dtypes is None:
+            if first is None or len(first) == 0:
+                raise ValueError("could not determine datatypes: "
+                                 "no data in %s" % path)
+            # infer the types from the first chunk
+            names, types, columns = frame_to_columns(first)
+            if first.index.name is not None:
+                names, columns = names[1:], columns[1:]
+            sample = [dict(zip(names, row)) for row in izip(*columns)]
+            dtypes = dict_to_dtypes(sample, order=names)
+        else:
+            dtypes = list(dtypes)
+            names = [col for col, dtype in dtypes]
+
+        # insert primary key column, if requested
+        if primary_key is not None and primary_key not in names:
+            dtypes.insert(0, (primary_key, int))
+
+        tbl = cls.create(
+            db, name, dtypes, primary_key=primary_key,
+            autoincrement=autoincrement, verbose=verbose)
+        if first is not None:
+            for chunk in chain([first], chunks):
+                tbl.insert(chunk)
+
+        return tbl
+
+    def save_csv(self, path, columns=None, where=None, chunksize=10000,
+                 compression='infer'):
         r"""
         Write table data to a CSV text file.
 
@@ -664,6 +1899,10 @@ class Table(object):
         :meth:`~dbtools.Table.select` with those arguments is what
         will be written to the csv file.
 
+        The rows are written straight from the database cursor,
+        `chunksize` rows at a time, so the whole selection is never
+        held in memory.
+
         Parameters
         ----------
         path : string
@@ -672,14 +1911,168 @@ class Table(object):
             See `select`
         where : (optional)
             See `select`
+        chunksize : int (default=10000)
+            Number of rows to fetch and write at a time.
+        compression : string (default='infer')
+            Either 'gzip' or None. If 'infer', the file is compressed
+            with gzip if `path` ends with '.gz'.
 
         """
 
-        table = self.select(columns=columns, where=where)
-        table.to_csv(path)
+        # the index column comes first, like in a DataFrame
+        cols, index = self._select_query(columns)[1:3]
+        if index is not None:
+            cols = [index] + [col for col in cols if col != index]
+        cmd, cols, index, where_str = self._select_query(cols, where)
+
+        # without an index column, number the rows like pandas does
+        if index is None:
+            header = [""] + cols
+        else:
+            header = cols
+
+        chunks = sql_iterate(
+            self.db, cmd, chunksize, verbose=self.verbose)
+        with open_csv(path, compression=compression) as fh:
+            writer = csv.writer(fh, lineterminator="\n")
+            writer.writerow(header)
+            start = 0
+            for rows in chunks:
+                if index is None:
+                    rows = [(i,) + row for i, row in enumerate(rows, start)]
+                    start += len(rows)
+                writer.writerows(rows)
+
+    def save_columns(self, path, columns=None, where=None):
+        r"""
+        Write table data to a directory of binary column files.
+
+        Each column is saved as a typed NumPy ``.npy`` file (with a
+        separate mask file for columns with ``NULL`` values), and the
+        column names, declared types, primary key and autoincrement
+        setting are saved in ``schema.json``. Unlike CSV files, this
+        keeps the types of the data, and the files can be memory-mapped
+        back in with :func:`~dbtools.columns.read_columns`.
+
+        Parameters
+        ----------
+        path : string
+            Path to the directory to save the files in.
+        columns : (optional)
+            See `select`
+        where : (optional)
+            See `select`
+
+        """
+
+        cmd, cols, index, where_str = self._select_query(columns, where)
+        types = self._types(cols)
+        arrays = sql_fetch_arrays(self.db, cmd, types, verbose=self.verbose)
+        info = {
+            'name': self.name,
+            'columns': cols,
+            'types': types,
+            'primary_key': self.primary_key,
+            'autoincrement': self.autoincrement,
+        }
+        write_columns(path, info, arrays)
+
+    def load_columns(self, path):
+        r"""
+        Insert data written by :meth:`~dbtools.Table.save_columns` into
+        the table.
+
+        Parameters
+        ----------
+        path : string
+            Path to the directory with the column files.
+
+        Returns
+        -------
+        count : int
+            The number of rows that were inserted.
+
+        """
+
+        schema, arrays = read_columns(path)
+        values = {}
+        for name, arr in arrays.items():
+            if isinstance(arr, np.ma.MaskedArray):
+                # masked values become None
+                values[name] = arr.tolist()
+            else:
+                values[name] = arr
+        self.insert(values)
+        return schema['rows']
+
+    @classmethod
+    def create_from_columns(cls, db, name, path, verbose=False):
+        r"""
+        Create a table called `name` in the database `db` from data
+        written by :meth:`~dbtools.Table.save_columns`.
+
+        The table is created with the saved column types, primary key
+        and autoincrement setting, and then the data is inserted as in
+        :meth:`~dbtools.Table.load_columns`.
+
+        Parameters
+        ----------
+        db : string or sqlite3.Connection
+            Path to the SQLite database, or a connection to the database.
+        name : string
+            Name of the desired table.
+        path : string
+            Path to the directory with the column files.
+        verbose : bool (optional)
+            Print out SQL command information.
+
+        Returns
+        -------
+        tbl : dbtools.Table
+            Newly created Table object
+
+        """
+
+        with open(os.path.join(path, SCHEMA_FILE)) as fh:
+            schema = json.load(fh)
+
+        pytypes = {
+            'INTEGER': int,
+            'REAL': float,
+            'TEXT': str,
+            'BLOB': blob_type,
+        }
+        dtypes = []
+        for col in schema['columns']:
+            if col['type'] not in pytypes:
+                raise ValueError("invalid data type: %s" % col['type'])
+            dtypes.append((col['name'], pytypes[col['type']]))
+
+        tbl = cls.create(
+            db, name, dtypes, primary_key=schema['primary_key'],
+            autoincrement=schema['autoincrement'], verbose=verbose)
+        tbl.load_columns(path)
+        return tbl
 
     def __repr__(self):
         return self.repr
 
     def __str__(self):
         return self.repr
+
+
+def _select_partition(args):
+    r"""
+    Select part of a table, in a worker process of
+    :meth:`~dbtools.Table.parallel_select`.
+
+    """
+
+    path, name, columns, where = args
+    # forked workers inherit the parent's connection pool, and SQLite
+    # connections must not be used across a fork, so open our own
+    conn = default_pool._open(path, readonly=True)
+    try:
+        return Table(conn, name).select(columns=columns, where=where)
+    finally:
+        conn.close()
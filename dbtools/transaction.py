@@ -0,0 +1,213 @@
+import time
+
+# transactions on connections that cannot hold attributes (i.e., plain
+# sqlite3.Connection objects), only while the transaction is active
+_active = {}
+
+
+def get_transaction(conn):
+    r"""
+    Get the active :class:`~dbtools.transaction.Transaction` on the
+    connection `conn`, or None if there is none.
+
+    """
+
+    try:
+        return conn._dbtools_transaction
+    except AttributeError:
+        return _active.get(conn, None)
+
+
+def _set_transaction(conn, txn):
+    try:
+        conn._dbtools_transaction = txn
+    except AttributeError:
+        if txn is None:
+            _active.pop(conn, None)
+        else:
+            _active[conn] = txn
+
+
+class _Statement(object):
+    r"""
+    Context manager around a single statement run in a transaction.
+
+    """
+
+    def __init__(self, txn):
+        self.txn = txn
+
+    def __enter__(self):
+        return self.txn.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.txn._executed()
+
+
+class Transaction(object):
+    r"""
+    Group the writes to a database into a single transaction.
+
+    While the transaction is active, statements executed by dbtools on
+    the connection (e.g. by :meth:`~dbtools.Table.insert`,
+    :meth:`~dbtools.Table.update` and :meth:`~dbtools.Table.delete`)
+    are not committed individually. Instead, everything is committed
+    when the transaction ends, or rolled back if it ends with an
+    exception.
+
+    Optionally, the transaction can be committed early ("flushed")
+    after every `flush_every` writing statements, or when a writing
+    statement finishes more than `flush_interval` seconds after the
+    last commit. Flushes only happen after a statement, so an idle
+    transaction is not committed until it ends.
+
+    Transactions can be nested, in which case only the outermost one
+    commits.
+
+    Use :func:`~dbtools.transaction.transaction` or
+    :meth:`~dbtools.Table.batch` to create one.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the SQLite database.
+    flush_every : int (optional)
+        Commit after this many writing statements.
+    flush_interval : float (optional)
+        Commit after this many seconds.
+
+    """
+
+    def __init__(self, conn, flush_every=None, flush_interval=None):
+        self.conn = conn
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.depth = 0
+        self.pending = 0
+
+    def __enter__(self):
+        outer = get_transaction(self.conn)
+        if outer is not None:
+            # defer to the transaction that is already active
+            outer.depth += 1
+            self.outer = outer
+            return outer
+
+        self.outer = None
+        self.depth = 1
+        self.pending = 0
+        self.changes = self.conn.total_changes
+        self.last_commit = time.time()
+        _set_transaction(self.conn, self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.outer is not None:
+            self.outer.depth -= 1
+            return
+
+        _set_transaction(self.conn, None)
+        if exc_type is None:
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+
+    def statement(self):
+        r"""
+        Get a context manager for running a statement in this
+        transaction (instead of committing it on its own).
+
+        """
+
+        return _Statement(self)
+
+    def _executed(self):
+        r"""
+        Record that a statement has finished, and flush if necessary.
+
+        """
+
+        # only count statements that actually changed the database
+        changes = self.conn.total_changes
+        if changes == self.changes:
+            return
+        self.changes = changes
+        self.pending += 1
+
+        if self.flush_every is not None and self.pending >= self.flush_every:
+            self.flush()
+        elif (self.flush_interval is not None and
+                (time.time() - self.last_commit) >= self.flush_interval):
+            self.flush()
+
+    def ignore(self, changes):
+        r"""
+        Do not count `changes` changes made since the last statement
+        (e.g. to temporary tables) as a writing statement.
+
+        """
+
+        self.changes += changes
+
+    def flush(self):
+        r"""
+        Commit the statements executed so far, and keep going.
+
+        """
+
+        self.conn.commit()
+        self.pending = 0
+        self.last_commit = time.time()
+
+
+def transaction(db, flush_every=None, flush_interval=None):
+    r"""
+    Group the writes to the database `db` into a single transaction.
+
+    For example::
+
+        with transaction("data.db"):
+            for trial in trials:
+                tbl.insert(trial)
+
+    See :class:`~dbtools.transaction.Transaction` for details.
+
+    Parameters
+    ----------
+    db : string or sqlite3.Connection
+        Path to the SQLite database, or a connection to the database.
+    flush_every : int (optional)
+        Commit after this many writing statements.
+    flush_interval : float (optional)
+        Commit after this many seconds.
+
+    Returns
+    -------
+    txn : dbtools.transaction.Transaction
+        The transaction, to be used as a context manager.
+
+    """
+
+    # imported here, as dbtools.util (and thus dbtools.connection)
+    # depends on this module
+    from .connection import connect
+
+    return Transaction(
+        connect(db), flush_every=flush_every, flush_interval=flush_interval)
+
+
+def commit_context(conn):
+    r"""
+    Get a context manager for running a write statement on `conn`.
+
+    If a transaction is active on the connection, the statement becomes
+    part of it. Otherwise, the statement is committed on its own (or
+    rolled back if it fails).
+
+    """
+
+    txn = get_transaction(conn)
+    if txn is None:
+        return conn
+    return txn.statement()
@@ -1,5 +1,17 @@
+import gzip
 import numpy as np
+import pandas as pd
 import sqlite3 as sql
+import threading
+
+from collections import OrderedDict
+
+from .transaction import commit_context
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 import sys
 if sys.version_info[0] >= 3:
@@ -11,6 +23,68 @@ else:
     string_types = (str, unicode)
     blob_type = buffer
 
+try:
+    from itertools import izip
+except ImportError:
+    izip = zip
+
+# the default value of SQLITE_MAX_VARIABLE_NUMBER before SQLite 3.32,
+# i.e. the number of "?" parameters that any SQLite will accept
+max_variables = 999
+
+# numpy dtypes for the SQLite column types that have a typed fetch path
+sql_dtypes = {
+    'INTEGER': np.dtype(np.int64),
+    'REAL': np.dtype(np.float64),
+}
+
+#: Number of plain `sqlite3.Connection` objects whose dbtools state is
+#: kept by :func:`~dbtools.util.connection_state`
+max_plain_connections = 16
+
+# state of the most recently used connections that cannot hold
+# attributes, in order of least to most recently used
+_plain_state = OrderedDict()
+_plain_lock = threading.Lock()
+
+
+def connection_state(conn, name, factory):
+    r"""
+    Get the dbtools state `name` (e.g. the catalog) of the connection
+    `conn`, which is created with ``factory(conn)`` the first time it
+    is needed.
+
+    The state is stored on connections opened by dbtools (see
+    :class:`~dbtools.connection.Connection`). Plain `sqlite3.Connection`
+    objects cannot hold attributes, so the state of the
+    :data:`~dbtools.util.max_plain_connections` most recently used ones
+    is kept here instead (which keeps them from being closed until
+    their state is discarded).
+
+    """
+
+    attr = "_dbtools_%s" % name
+    try:
+        return getattr(conn, attr)
+    except AttributeError:
+        pass
+
+    if hasattr(conn, '__dict__'):
+        value = factory(conn)
+        setattr(conn, attr, value)
+        return value
+
+    with _plain_lock:
+        state = _plain_state.pop(conn, None)
+        if state is None:
+            state = {}
+        _plain_state[conn] = state
+        while len(_plain_state) > max_plain_connections:
+            _plain_state.popitem(last=False)
+        if name not in state:
+            state[name] = factory(conn)
+        return state[name]
+
 def dict_to_dtypes(data, order=None):
     r"""
     Parses data types from a dictionary or list of dictionaries.
@@ -84,6 +158,111 @@ def dict_to_dtypes(data, order=None):
     return types
 
 
+def to_sql_column(values):
+    r"""
+    Convert a column of data into native Python values that can be
+    bound directly by `sqlite3`.
+
+    The whole column is converted at once by NumPy, so numeric columns
+    never go through a per-value Python conversion. For object columns,
+    the datatype is taken from the first value that is not None, and
+    values of a different type are coerced to it.
+
+    For example::
+
+        to_sql_column(np.array([1, 2, 3], dtype='int32'))
+
+    will return::
+
+        (int, [1, 2, 3])
+
+    Missing values (None, or NaN in object columns) are returned as
+    None, which `sqlite3` stores as ``NULL``.
+
+    Parameters
+    ----------
+    values : array-like
+        The column data, e.g. a numpy array or a pandas Series or Index.
+
+    Returns
+    -------
+    dtype : type
+        Native Python type of the values in the column
+    column : list
+        The column values, as native Python objects
+
+    """
+
+    arr = np.asarray(values)
+    kind = arr.dtype.kind
+
+    if kind in 'iu':
+        return int, arr.astype(np.int64).tolist()
+    elif kind == 'f':
+        return float, arr.astype(np.float64).tolist()
+
+    # string, boolean and object columns are converted element-wise
+    # by numpy, and then checked against the first non-null value
+    # (pandas uses NaN for missing values in object columns)
+    column = arr.tolist()
+    if kind == 'O':
+        column = [None if x != x else x for x in column]
+    for first in column:
+        if first is not None:
+            break
+    else:
+        raise ValueError("could not determine datatype of column")
+    dtype = type(np.array([first]).tolist()[0])
+    if kind == 'O':
+        column = [x if x is None or type(x) is dtype else dtype(x)
+                  for x in column]
+
+    return dtype, column
+
+
+def frame_to_columns(data):
+    r"""
+    Convert the columns of a pandas DataFrame into native Python values
+    with :func:`~dbtools.util.to_sql_column`.
+
+    If the index of the DataFrame has a name, it is included as the
+    first column.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        The DataFrame to convert.
+
+    Returns
+    -------
+    names : list of strings
+        The column names.
+    dtypes : list of types
+        Native Python type of each column, or None if the column only
+        holds missing values.
+    columns : list of lists
+        The values of each column.
+
+    """
+
+    names = list(data.columns)
+    columns = [data.iloc[:, i] for i in range(len(names))]
+    if data.index.name is not None:
+        names.insert(0, data.index.name)
+        columns.insert(0, data.index)
+
+    dtypes = []
+    for i in range(len(columns)):
+        try:
+            dtype, columns[i] = to_sql_column(columns[i])
+        except ValueError:
+            # there is no data in this column
+            dtype, columns[i] = None, [None] * len(data)
+        dtypes.append(dtype)
+
+    return names, dtypes, columns
+
+
 def sql_execute(conn, cmd, fetchall=False, verbose=False):
     r"""
     Execute a SQL command `cmd` in database `db`.
@@ -113,7 +292,8 @@ def sql_execute(conn, cmd, fetchall=False, verbose=False):
     if isinstance(cmd, string_types):
         cmd = [cmd]
 
-    with conn:
+    # commit the command, unless it is part of a larger transaction
+    with commit_context(conn):
         # get the database cursor
         cur = conn.cursor()
         # optionally print the command we're running
@@ -128,3 +308,264 @@ def sql_execute(conn, cmd, fetchall=False, verbose=False):
             result = None
 
     return result
+
+
+def sql_iterate(conn, cmd, chunksize, verbose=False):
+    r"""
+    Execute a SQL query `cmd` in database `db`, and iterate over the
+    result in chunks of at most `chunksize` rows.
+
+    Only one chunk of rows is held in memory at a time, as the rows are
+    retrieved with `sqlite3.Cursor.fetchmany`.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the SQLite database.
+    cmd : string or list
+        Command to be executed. See :func:`~dbtools.util.sql_execute`.
+    chunksize : int
+        Maximum number of rows in each chunk.
+    verbose : bool (optional)
+        Print the command that is run.
+
+    Yields
+    ------
+    rows : list
+        The next (non-empty) chunk of rows of the result.
+
+    """
+
+    if chunksize < 1:
+        raise ValueError("invalid chunksize: %s" % chunksize)
+
+    # wrap the command in a list, if it isn't one already
+    if isinstance(cmd, string_types):
+        cmd = [cmd]
+
+    # get the database cursor
+    cur = conn.cursor()
+    # optionally print the command we're running
+    if verbose:
+        print(", ".join([str(x) for x in cmd]))
+    # run the command and fetch the results a chunk at a time
+    try:
+        cur.execute(*cmd)
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+
+
+def _typed_column(values, dtype):
+    r"""
+    Convert a sequence of values fetched from SQLite into an array of
+    type `dtype`, or of a wider type if the values do not fit (integers
+    with ``NULL`` values become floats with NaN, and anything that is
+    not numeric becomes an object array).
+
+    """
+
+    if dtype.kind == 'O' or len(values) == 0:
+        arr = np.empty(len(values), dtype=dtype)
+        arr[:] = values
+        return arr
+
+    arr = np.array(values)
+    if arr.dtype.kind in 'iu':
+        return arr.astype(np.result_type(arr.dtype, dtype))
+    elif arr.dtype.kind == 'f':
+        return arr
+
+    # NULL values turn into NaN, and text means we need objects
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        arr = np.empty(len(values), dtype=object)
+        arr[:] = values
+        return arr
+
+
+def rows_to_arrays(rows, sqltypes):
+    r"""
+    Convert rows fetched from SQLite into one typed array per column.
+
+    Parameters
+    ----------
+    rows : list of tuples
+        The rows, as returned by `sqlite3.Cursor.fetchall`.
+    sqltypes : list of strings
+        The declared SQLite type of each column. ``INTEGER`` and
+        ``REAL`` columns are converted to int64 and float64 arrays
+        (promoted as needed for ``NULL`` or mistyped values), and all
+        other columns are returned as object arrays.
+
+    Returns
+    -------
+    arrays : list of numpy.ndarray
+        One array for each column.
+
+    """
+
+    dtypes = [sql_dtypes.get(t, np.dtype(object)) for t in sqltypes]
+    if len(rows) == 0:
+        return [np.empty(0, dtype=dtype) for dtype in dtypes]
+    columns = list(izip(*rows))
+    return [_typed_column(values, dtype)
+            for values, dtype in izip(columns, dtypes)]
+
+
+def sql_fetch_arrays(conn, cmd, sqltypes, chunksize=10000, verbose=False):
+    r"""
+    Execute a SQL query `cmd` in database `db`, and return the result
+    as one typed array per column.
+
+    The rows are fetched in chunks (see
+    :func:`~dbtools.util.sql_iterate`), and each chunk is copied
+    column-by-column into preallocated arrays, which are grown
+    geometrically if the result is larger than expected. This avoids
+    holding the whole result as a list of Python tuples.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the SQLite database.
+    cmd : string or list
+        Command to be executed. See :func:`~dbtools.util.sql_execute`.
+    sqltypes : list of strings
+        The declared SQLite type of each column in the result. See
+        :func:`~dbtools.util.rows_to_arrays`.
+    chunksize : int (optional)
+        Number of rows to fetch at a time.
+    verbose : bool (optional)
+        Print the command that is run.
+
+    Returns
+    -------
+    arrays : list of numpy.ndarray
+        One array for each column.
+
+    """
+
+    arrays = [np.empty(chunksize, dtype=sql_dtypes.get(t, object))
+              for t in sqltypes]
+    size = 0
+
+    for rows in sql_iterate(conn, cmd, chunksize, verbose=verbose):
+        end = size + len(rows)
+        chunk = rows_to_arrays(rows, sqltypes)
+        for i, values in enumerate(chunk):
+            arr = arrays[i]
+            # widen the type of the column, if necessary
+            dtype = np.result_type(arr.dtype, values.dtype)
+            if dtype != arr.dtype:
+                arr = arr.astype(dtype)
+            # grow the column, if necessary
+            if end > len(arr):
+                extra = np.empty(max(len(arr), end - len(arr)), arr.dtype)
+                arr = np.concatenate([arr[:size], extra])
+            arr[size:end] = values
+            arrays[i] = arr
+        size = end
+
+    return [arr[:size] for arr in arrays]
+
+
+def read_csv_chunks(path, chunksize, **kwargs):
+    r"""
+    Read a CSV file in chunks, parsing the next chunk on a background
+    thread while the current one is being used.
+
+    Parameters
+    ----------
+    path : string
+        Path to the CSV file.
+    chunksize : int
+        Number of rows in each chunk.
+    kwargs :
+        Extra keyword arguments for `pandas.read_csv`.
+
+    Yields
+    ------
+    chunk : pandas.DataFrame
+        The next chunk of the file.
+
+    """
+
+    chunks = queue.Queue(maxsize=1)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # give up if the consumer went away
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def parse():
+        try:
+            reader = pd.read_csv(path, chunksize=chunksize, **kwargs)
+            for chunk in reader:
+                if not put((chunk, None)):
+                    return
+        except Exception as err:
+            put((None, err))
+        else:
+            put((done, None))
+
+    thread = threading.Thread(target=parse)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            chunk, err = chunks.get()
+            if err is not None:
+                raise err
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        stop.set()
+        thread.join()
+
+
+def open_csv(path, compression=None):
+    r"""
+    Open a file for writing with the `csv` module.
+
+    Parameters
+    ----------
+    path : string
+        Path to the file.
+    compression : string (optional)
+        Either 'gzip' or None. If 'infer', the file is compressed with
+        gzip if `path` ends with '.gz'.
+
+    Returns
+    -------
+    fh : file object
+        The opened file.
+
+    """
+
+    if compression == 'infer':
+        compression = 'gzip' if path.endswith('.gz') else None
+
+    if compression == 'gzip':
+        if sys.version_info[0] >= 3:
+            return gzip.open(path, 'wt', newline='')
+        return gzip.open(path, 'wb')
+    elif compression is None:
+        if sys.version_info[0] >= 3:
+            return open(path, 'w', newline='')
+        return open(path, 'wb')
+    else:
+        raise ValueError("invalid compression: %s" % compression)
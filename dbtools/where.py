@@ -0,0 +1,455 @@
+import numpy as np
+
+from .transaction import get_transaction
+from .util import sql_execute, to_sql_column, max_variables, connection_state
+from .util import string_types, blob_type
+
+#: ``isin`` conditions with more values than this are compiled to a
+#: subquery on a temporary table, instead of one placeholder per value
+#: (except on read-only connections, which cannot create tables)
+max_inline = 100
+
+# comparison operators, and their SQL
+_operators = {
+    '==': '=', '=': '=', '!=': '!=', '<>': '!=',
+    '<': '<', '<=': '<=', '>': '>', '>=': '>=',
+    'like': 'LIKE',
+}
+
+
+class Condition(object):
+    r"""
+    Base class of conditions for the ``WHERE`` clause of a statement.
+
+    Conditions can be combined with ``&`` (and), ``|`` (or) and ``~``
+    (not), e.g.::
+
+        (col('age') > 25) & ~col('name').isin(['Alyssa', 'Ben'])
+
+    """
+
+    def __and__(self, other):
+        return And(self, as_condition(other))
+
+    def __rand__(self, other):
+        return And(as_condition(other), self)
+
+    def __or__(self, other):
+        return Or(self, as_condition(other))
+
+    def __ror__(self, other):
+        return Or(as_condition(other), self)
+
+    def __invert__(self):
+        return Not(self)
+
+    def compile(self, compiler):
+        r"""
+        Get the SQL for this condition, adding its arguments to
+        `compiler`.
+
+        """
+
+        raise NotImplementedError
+
+    def __repr__(self):
+        sql, args = compile_where(self)
+        return "%s(%r, %r)" % (type(self).__name__, sql, args)
+
+
+class Raw(Condition):
+    r"""
+    A conditional string, with optional arguments for its question
+    marks, as accepted by :meth:`~dbtools.Table.select`.
+
+    """
+
+    def __init__(self, sql, args=None):
+        if args is None:
+            args = ()
+        elif isinstance(args, string_types) or not hasattr(args, '__iter__'):
+            args = (args,)
+        self.sql = sql
+        self.args = tuple(args)
+
+    def compile(self, compiler):
+        compiler.args.extend(self.args)
+        return self.sql
+
+
+class Comparison(Condition):
+    r"""
+    Comparison of a column with a value. Comparisons of columns with
+    None compile to ``IS NULL`` or ``IS NOT NULL``.
+
+    """
+
+    def __init__(self, column, op, value):
+        if op not in _operators:
+            raise ValueError("invalid operator: %s" % op)
+        self.column = column
+        self.op = _operators[op]
+        self.value = _to_sql_value(value)
+
+    def compile(self, compiler):
+        if self.value is None:
+            if self.op == '=':
+                return "%s IS NULL" % self.column
+            elif self.op == '!=':
+                return "%s IS NOT NULL" % self.column
+            raise ValueError("cannot compare %s with None" % self.column)
+        compiler.args.append(self.value)
+        if self.op == 'LIKE':
+            return "%s LIKE ?" % self.column
+        return "%s%s?" % (self.column, self.op)
+
+
+class In(Condition):
+    r"""
+    Check whether a column is one of a list of values. Long lists (see
+    :data:`~dbtools.where.max_inline`) are stored in a temporary table,
+    or on read-only connections, split into several ``IN`` lists of at
+    most :data:`~dbtools.util.max_variables` values.
+
+    """
+
+    def __init__(self, column, values):
+        self.column = column
+        # numeric arrays are converted at once, like columns of data
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'iuf':
+            self.values = to_sql_column(values)[1]
+        else:
+            self.values = [_to_sql_value(value) for value in values]
+
+    def compile(self, compiler):
+        values = self.values
+        if (len(values) > max_inline and compiler.conn is not None and
+                not compiler.readonly):
+            table = compiler.temp_table(values)
+            return "%s IN (SELECT value FROM %s)" % (self.column, table)
+        if len(values) <= max_variables:
+            compiler.args.extend(values)
+            return "%s IN (%s)" % (self.column, ",".join("?" * len(values)))
+
+        # stay under SQLite's limit on the number of values in a list
+        parts = []
+        for i in range(0, len(values), max_variables):
+            chunk = values[i:i + max_variables]
+            compiler.args.extend(chunk)
+            parts.append("%s IN (%s)" % (
+                self.column, ",".join("?" * len(chunk))))
+        return "(%s)" % " OR ".join(parts)
+
+
+class And(Condition):
+    r"""
+    Conjunction of conditions.
+
+    """
+
+    op = "AND"
+
+    def __init__(self, *conditions):
+        self.conditions = [as_condition(c) for c in conditions]
+
+    def compile(self, compiler):
+        if len(self.conditions) == 0:
+            return "1" if self.op == "AND" else "0"
+        parts = []
+        for cond in self.conditions:
+            sql = cond.compile(compiler)
+            if isinstance(cond, (And, Or, Raw)) and len(self.conditions) > 1:
+                sql = "(%s)" % sql
+            parts.append(sql)
+        return (" %s " % self.op).join(parts)
+
+
+class Or(And):
+    r"""
+    Disjunction of conditions.
+
+    """
+
+    op = "OR"
+
+
+class Not(Condition):
+    r"""
+    Negation of a condition.
+
+    """
+
+    def __init__(self, condition):
+        self.condition = as_condition(condition)
+
+    def compile(self, compiler):
+        return "NOT (%s)" % self.condition.compile(compiler)
+
+
+class Col(object):
+    r"""
+    A column, for building conditions with Python operators::
+
+        col('age') == 25
+        col('height') > 1.7
+        col('name').isin(['Alyssa', 'Ben'])
+
+    Use :func:`~dbtools.where.col` to create one.
+
+    """
+
+    def __init__(self, name):
+        self.name = str(name)
+
+    def __eq__(self, value):
+        return Comparison(self.name, '=', value)
+
+    def __ne__(self, value):
+        return Comparison(self.name, '!=', value)
+
+    def __lt__(self, value):
+        return Comparison(self.name, '<', value)
+
+    def __le__(self, value):
+        return Comparison(self.name, '<=', value)
+
+    def __gt__(self, value):
+        return Comparison(self.name, '>', value)
+
+    def __ge__(self, value):
+        return Comparison(self.name, '>=', value)
+
+    __hash__ = object.__hash__
+
+    def like(self, pattern):
+        r"""Match the column against a ``LIKE`` pattern."""
+        return Comparison(self.name, 'like', pattern)
+
+    def isin(self, values):
+        r"""Check whether the column is one of `values`."""
+        return In(self.name, values)
+
+    def isnull(self):
+        r"""Check whether the column is ``NULL``."""
+        return Comparison(self.name, '=', None)
+
+    def notnull(self):
+        r"""Check whether the column is not ``NULL``."""
+        return Comparison(self.name, '!=', None)
+
+    def __repr__(self):
+        return "col(%r)" % self.name
+
+
+def col(name):
+    r"""
+    Refer to the column `name` in a condition (see
+    :class:`~dbtools.where.Col`).
+
+    """
+
+    return Col(name)
+
+
+def _to_sql_value(value):
+    r"""
+    Convert NumPy scalars to native Python values, which `sqlite3` can
+    bind.
+
+    """
+
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def from_dict(where):
+    r"""
+    Build a condition from a dictionary mapping column names to:
+
+    * a value, to select rows where the column is equal to it (or
+      ``NULL``, for None),
+    * an (operator, value) tuple, e.g. ``('>', 1.7)``, or
+    * a list (or other non-tuple sequence) of values, to select rows
+      where the column is one of them.
+
+    The conditions are combined with ``AND``, in order of column name,
+    so that equal dictionaries always compile to the same SQL.
+
+    """
+
+    conditions = []
+    for name in sorted(where.keys()):
+        value = where[name]
+        if isinstance(value, tuple):
+            if len(value) != 2:
+                raise ValueError("invalid condition for %s: %s" % (
+                    name, value))
+            op, value = value
+            if op == 'in':
+                conditions.append(In(name, value))
+            else:
+                conditions.append(Comparison(name, op, value))
+        elif (hasattr(value, '__iter__') and
+                not isinstance(value, string_types + (blob_type,))):
+            conditions.append(In(name, value))
+        else:
+            conditions.append(Comparison(name, '=', value))
+    return And(*conditions)
+
+
+def as_condition(where):
+    r"""
+    Convert `where` to a :class:`~dbtools.where.Condition`. It may be a
+    condition, a dictionary (see :func:`~dbtools.where.from_dict`), a
+    conditional string, or a (string, arguments) tuple.
+
+    """
+
+    if isinstance(where, Condition):
+        return where
+    elif isinstance(where, dict):
+        return from_dict(where)
+    elif isinstance(where, string_types):
+        return Raw(where)
+    elif isinstance(where, tuple) and len(where) == 2:
+        return Raw(*where)
+    raise ValueError("invalid condition: %r" % (where,))
+
+
+class _Compiler(object):
+    r"""
+    State of the compilation of a condition: the arguments of the
+    statement, and the temporary tables used by ``isin`` conditions.
+
+    """
+
+    def __init__(self, conn, verbose):
+        self.conn = conn
+        self.verbose = verbose
+        self.args = []
+        self.tables = 0
+        self._readonly = None
+
+    @property
+    def readonly(self):
+        r"""
+        Whether the connection cannot write to temporary tables, i.e.
+        whether it has ``PRAGMA query_only`` set.
+
+        """
+
+        if self._readonly is None:
+            cmd = "PRAGMA query_only"
+            self._readonly = bool(sql_execute(
+                self.conn, cmd, fetchall=True, verbose=self.verbose)[0][0])
+        return self._readonly
+
+    def temp_table(self, values):
+        r"""
+        Fill a temporary table with `values`, and return its name.
+
+        The tables are numbered in the order they are used in the
+        condition, so that the same condition always compiles to the
+        same SQL.
+
+        """
+
+        name = "temp._dbtools_in_%d" % self.tables
+        self.tables += 1
+
+        # the temporary table is not part of the data, so it is filled
+        # outside of any transaction's accounting of writing statements
+        tables = temp_tables(self.conn)
+        txn = get_transaction(self.conn)
+        changes = self.conn.total_changes
+        if txn is None:
+            with self.conn:
+                self._fill(name, values)
+        else:
+            self._fill(name, values)
+        changes = self.conn.total_changes - changes
+        if txn is not None:
+            txn.ignore(changes)
+        tables.changes += changes
+        tables.values[name] = tuple(values)
+        return name
+
+    def _fill(self, name, values):
+        cmds = ["CREATE TEMP TABLE IF NOT EXISTS %s(value)" % name[5:],
+                "DELETE FROM %s" % name]
+        for cmd in cmds:
+            if self.verbose:
+                print(cmd)
+            self.conn.execute(cmd)
+        cmd = "INSERT INTO %s VALUES (?)" % name
+        if self.verbose:
+            print(cmd)
+        self.conn.executemany(cmd, [(value,) for value in values])
+
+
+class _TempTables(object):
+    r"""
+    The temporary tables of ``isin`` lists on a connection: their
+    contents, and the number of changes made to them (which are not
+    changes to the data, see :func:`~dbtools.cache.data_version`).
+
+    """
+
+    def __init__(self, conn):
+        self.values = {}
+        self.changes = 0
+
+
+def temp_tables(conn):
+    r"""
+    Get the :class:`~dbtools.where._TempTables` of the connection
+    `conn`.
+
+    """
+
+    return connection_state(conn, "temp_tables", _TempTables)
+
+
+def temp_values(conn, sql):
+    r"""
+    Get the contents of the temporary tables that the statement `sql`
+    uses for its ``isin`` lists, which identify its result along with
+    its arguments.
+
+    """
+
+    values = temp_tables(conn).values
+    return tuple([values[name] for name in sorted(values)
+                  if "%s)" % name in sql])
+
+
+def compile_where(where, conn=None, verbose=False):
+    r"""
+    Compile a condition (see :func:`~dbtools.where.as_condition`) to a
+    parameterized conditional string. Equal conditions always compile to
+    the same string, so the statements they are used in can be reused
+    from SQLite's statement cache.
+
+    Parameters
+    ----------
+    where : condition, dict, string or tuple
+        The condition.
+    conn : sqlite3.Connection (optional)
+        Connection to the database the condition is used on, for
+        storing long ``isin`` lists in temporary tables. If None, or if
+        the connection is read-only, the lists are always passed as
+        arguments.
+    verbose : bool (optional)
+        Print out SQL command information.
+
+    Returns
+    -------
+    out : tuple
+        2-tuple of (conditional string, argument list)
+
+    """
+
+    compiler = _Compiler(conn, verbose)
+    sql = as_condition(where).compile(compiler)
+    return sql, compiler.args
@@ -0,0 +1,254 @@
+import sqlite3
+import threading
+
+from concurrent.futures import Future
+
+from .connection import Connection
+from .profiles import apply_profile
+from .table import Table
+from .transaction import Transaction
+from .util import queue
+
+
+class Writer(object):
+    r"""
+    A background thread that owns the write connection to a database,
+    so that many threads can write to it without sharing a connection
+    or contending for the database lock.
+
+    Writes are submitted to a queue, and each submission returns a
+    `concurrent.futures.Future` for its result. The writer thread takes
+    everything that is waiting in the queue (up to `max_batch` items)
+    and runs it in a single transaction ("group commit"), with each item
+    in its own savepoint, so that an item that fails is rolled back on
+    its own. Futures are only resolved once their transaction has been
+    committed.
+
+    By default, the database is put into WAL mode (see
+    :data:`~dbtools.profiles.profiles`), so that readers using their own
+    connections are not blocked while the writer is committing.
+
+    The writer can be used as a context manager, in which case
+    :meth:`~dbtools.writer.Writer.close` is called on exit::
+
+        with Writer("data.db") as writer:
+            trials = writer.table("Trials")
+            futures = [trials.insert(trial) for trial in data]
+
+    Parameters
+    ----------
+    path : string
+        Path to the SQLite database.
+    profile : string or dict (default="wal_concurrent")
+        Profile of PRAGMA settings for the write connection, or None to
+        use SQLite's defaults.
+    max_batch : int (default=1000)
+        Maximum number of items to commit in one transaction.
+    maxsize : int (default=0)
+        Maximum number of items waiting in the queue (submitting blocks
+        when the queue is full). If 0, the queue size is unbounded.
+
+    """
+
+    def __init__(self, path, profile="wal_concurrent", max_batch=1000,
+                 maxsize=0):
+        if path in ("", ":memory:"):
+            raise ValueError("in-memory databases cannot have a writer")
+        if max_batch < 1:
+            raise ValueError("invalid max_batch: %s" % max_batch)
+
+        self.path = path
+        self.profile = profile
+        self.max_batch = int(max_batch)
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        started = Future()
+        self._thread = threading.Thread(
+            target=self._run, args=(started,), name="dbtools-writer")
+        self._thread.daemon = True
+        self._thread.start()
+        # raise any error from opening the database
+        started.result()
+
+    def _run(self, started):
+        r"""
+        Main loop of the writer thread.
+
+        """
+
+        try:
+            conn = sqlite3.connect(self.path, factory=Connection)
+            if self.profile is not None:
+                apply_profile(conn, self.profile)
+        except Exception as err:
+            started.set_exception(err)
+            return
+        started.set_result(None)
+
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                # take whatever else is already waiting
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._write(conn, batch)
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        r"""
+        Run a batch of queued items in one transaction.
+
+        """
+
+        results = []
+        try:
+            with Transaction(conn):
+                conn.execute("BEGIN")
+                for func, args, kwargs, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT dbtools_writer")
+                    try:
+                        result = func(conn, *args, **kwargs)
+                    except Exception as err:
+                        conn.execute("ROLLBACK TO dbtools_writer")
+                        conn.execute("RELEASE dbtools_writer")
+                        future.set_exception(err)
+                    else:
+                        conn.execute("RELEASE dbtools_writer")
+                        results.append((future, result))
+        except Exception as err:
+            # the transaction failed, so nothing was written: fail every
+            # item that has not failed on its own already
+            for func, args, kwargs, future in batch:
+                if future.done():
+                    continue
+                if (not future.running() and
+                        not future.set_running_or_notify_cancel()):
+                    continue
+                future.set_exception(err)
+        else:
+            for future, result in results:
+                future.set_result(result)
+
+    def submit(self, func, *args, **kwargs):
+        r"""
+        Queue a call to ``func(conn, *args, **kwargs)`` on the writer
+        thread, where `conn` is the write connection.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Future for the return value of `func`.
+
+        """
+
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise ValueError("the writer is closed")
+            self._queue.put((func, args, kwargs, future))
+        return future
+
+    def table(self, name):
+        r"""
+        Get a :class:`~dbtools.writer.WriterTable` for writing to the
+        table `name` through this writer.
+
+        """
+
+        return WriterTable(self, name)
+
+    def flush(self):
+        r"""
+        Wait until everything submitted so far has been committed.
+
+        """
+
+        self.submit(lambda conn: None).result()
+
+    def close(self):
+        r"""
+        Commit everything that is queued, and stop the writer thread.
+
+        """
+
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _call(conn, name, method, args, kwargs):
+    return getattr(Table(conn, name), method)(*args, **kwargs)
+
+
+class WriterTable(object):
+    r"""
+    Write-only view of a table, which runs the writing methods of
+    :class:`~dbtools.Table` on a :class:`~dbtools.writer.Writer`
+    thread. Each method takes the same arguments as the corresponding
+    :class:`~dbtools.Table` method, but returns a
+    `concurrent.futures.Future` for its result.
+
+    Use :meth:`~dbtools.writer.Writer.table` to create one. To read the
+    table, use a regular :class:`~dbtools.Table` (which gets its own
+    connection).
+
+    """
+
+    def __init__(self, writer, name):
+        self.writer = writer
+        self.name = str(name)
+
+    def _submit(self, method, args, kwargs):
+        return self.writer.submit(_call, self.name, method, args, kwargs)
+
+    def insert(self, *args, **kwargs):
+        r"""Queue a call to :meth:`~dbtools.Table.insert`."""
+        return self._submit('insert', args, kwargs)
+
+    def upsert(self, *args, **kwargs):
+        r"""Queue a call to :meth:`~dbtools.Table.upsert`."""
+        return self._submit('upsert', args, kwargs)
+
+    def update(self, *args, **kwargs):
+        r"""Queue a call to :meth:`~dbtools.Table.update`."""
+        return self._submit('update', args, kwargs)
+
+    def update_many(self, *args, **kwargs):
+        r"""Queue a call to :meth:`~dbtools.Table.update_many`."""
+        return self._submit('update_many', args, kwargs)
+
+    def delete(self, *args, **kwargs):
+        r"""Queue a call to :meth:`~dbtools.Table.delete`."""
+        return self._submit('delete', args, kwargs)
+
+    def delete_keys(self, *args, **kwargs):
+        r"""Queue a call to :meth:`~dbtools.Table.delete_keys`."""
+        return self._submit('delete_keys', args, kwargs)
+
+    def __repr__(self):
+        return "WriterTable(%r)" % self.name
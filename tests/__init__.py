@@ -1,6 +1,15 @@
+import os
+
 DBNAME = 'test.db'
 
 
+def remove_db():
+    """Remove the test database, and its write-ahead log files"""
+    for path in (DBNAME, DBNAME + "-wal", DBNAME + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
 def update_docstring(name, olddoc):
     # make sure it has a docstring
     if olddoc is None:
@@ -0,0 +1,51 @@
+"""Coroutines for the tests in test_aio.py, which are kept separate as
+they are not valid syntax before Python 3.5.
+
+"""
+
+import threading
+
+from dbtools.aio import AsyncTable
+from . import DBNAME
+
+
+async def create(db):
+    tbl = await AsyncTable.create(
+        db, "Foo", [('id', int), ('name', str)], primary_key='id')
+    await tbl.insert([[i, str(i)] for i in range(10)])
+    return tbl
+
+
+async def memory():
+    tbl = await create(':memory:')
+    data = await tbl.select()
+    assert list(data.index) == list(range(10))
+    assert list((await tbl[3])['name']) == ['3']
+    await tbl.update({'name': 'x'}, where="id=3")
+    await tbl.delete(where="id>5")
+    data = await tbl.select()
+    assert list(data['name']) == ['0', '1', '2', 'x', '4', '5']
+
+
+async def path():
+    await create(DBNAME)
+    tbl = AsyncTable(DBNAME, "Foo")
+    data = await tbl.select(where="id<3")
+    assert list(data.index) == [0, 1, 2]
+
+    # both tables share the executor thread for the database
+    thread = tbl._executor.submit(threading.current_thread).result()
+    assert thread is not threading.current_thread()
+    assert tbl._executor is AsyncTable(DBNAME, "Foo")._executor
+
+
+async def iter_select():
+    tbl = await create(':memory:')
+    chunks = []
+    async for chunk in tbl.iter_select(chunksize=4):
+        chunks.append(list(chunk.index))
+    assert chunks == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+async def missing():
+    await AsyncTable(':memory:', "Foo").select()
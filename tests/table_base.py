@@ -1,5 +1,8 @@
+import gzip
 import numpy as np
 import os
+import pandas as pd
+import shutil
 
 from nose.tools import raises
 from sqlite3 import OperationalError
@@ -307,3 +310,222 @@ class TestTable(object):
         self.insert()
         self.tbl.save_csv("test.csv")
         os.remove("test.csv")
+
+    def test_iter_select(self):
+        """Select data in chunks"""
+        self.insert()
+        chunks = list(self.tbl.iter_select(chunksize=3))
+        assert [len(chunk) for chunk in chunks] == [3, 1]
+        assert self.check(self.idata, pd.concat(chunks))
+
+    def test_select_chunksize(self):
+        """Select data in chunks with a where filter"""
+        self.insert()
+        chunks = list(self.tbl.select(where="age>24", chunksize=1))
+        assert len(chunks) == 3
+        assert self.check_data(self.idata[[0, 2, 3]], pd.concat(chunks))
+
+    def test_csv_chunksize(self):
+        """Write a csv file in chunks"""
+        self.insert()
+        self.tbl.save_csv("test.csv")
+        self.tbl.save_csv("test_chunks.csv", chunksize=3)
+        with open("test.csv") as fh:
+            expected = fh.read()
+        with open("test_chunks.csv") as fh:
+            assert fh.read() == expected
+        os.remove("test.csv")
+        os.remove("test_chunks.csv")
+
+    def test_update_many_key(self):
+        """Update many rows matched by a column"""
+        self.insert()
+        self.tbl.update_many([
+            {'name': 'Alyssa P. Hacker', 'age': 30},
+            {'name': 'Eva Lu Ator', 'age': 31}], key='name')
+        data = self.tbl.select()
+        assert list(data['age']) == [30, 24, 26, 31]
+
+    @raises(ValueError)
+    def test_update_many_bad_keys(self):
+        """Update many rows with inconsistent keys"""
+        self.insert()
+        self.tbl.update_many([
+            {'name': 'Alyssa P. Hacker', 'age': 30},
+            {'name': 'Eva Lu Ator', 'height': 60.0}], key='name')
+
+    @raises(OperationalError)
+    def test_upsert_no_constraint(self):
+        """Upsert on columns without a unique constraint"""
+        self.insert()
+        self.tbl.upsert(self.idata, conflict_columns='name')
+
+    def test_delete_keys(self):
+        """Delete rows by a list of keys"""
+        self.insert()
+        count = self.tbl.delete_keys(
+            ['Ben Bitdiddle', 'Eva Lu Ator', 'Nobody'], key='name')
+        assert count == 2
+        data = self.tbl.select()
+        assert list(data['name']) == ['Alyssa P. Hacker', 'Louis Reasoner']
+
+    def test_delete_keys_empty(self):
+        """Delete rows by an empty list of keys"""
+        self.insert()
+        assert self.tbl.delete_keys([], key='name') == 0
+        assert len(self.tbl.select()) == len(self.idata)
+
+    def test_insert_generator(self):
+        """Insert rows from a generator"""
+        self.tbl.insert(row for row in self.idata)
+        data = self.tbl.select()
+        assert self.check(self.idata, data)
+
+    def test_insert_chunksize(self):
+        """Insert rows from a generator in chunks"""
+        self.tbl.insert((row for row in self.idata), chunksize=3)
+        data = self.tbl.select()
+        assert self.check(self.idata, data)
+
+    def test_insert_chunksize_error(self):
+        """Keep the committed chunks when a later row is invalid"""
+        def rows():
+            for row in self.idata[:2]:
+                yield row
+            yield ['Alyssa P. Hacker']
+        try:
+            self.tbl.insert(rows(), chunksize=2)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected ValueError")
+        data = self.tbl.select()
+        assert self.check(self.idata[:2], data)
+
+    def test_insert_empty(self):
+        """Insert no rows"""
+        self.tbl.insert([])
+        self.tbl.insert(iter([]), chunksize=2)
+        assert len(self.tbl.select()) == 0
+
+    def idata_columns(self):
+        return list(self.tbl.columns[-self.idata.shape[1]:])
+
+    def test_insert_dataframe(self):
+        """Insert a dataframe"""
+        cols = self.idata_columns()
+        df = pd.DataFrame(self.idata, columns=cols)
+        self.tbl.insert(df)
+        data = self.tbl.select()
+        assert self.check(self.idata, data)
+
+    def test_insert_dataframe_roundtrip(self):
+        """Insert the output of select into another table"""
+        self.insert()
+        data = self.tbl.select()
+        self.tbl.delete()
+        self.tbl.insert(data)
+        assert self.check(self.idata, self.tbl.select())
+
+    def test_insert_structured_array(self):
+        """Insert a numpy structured array"""
+        cols = self.idata_columns()
+        types = dict(self.dtypes)
+        dtype = [(str(col), 'U32' if types[col] is str else types[col])
+                 for col in cols]
+        arr = np.array([tuple(row) for row in self.idata], dtype=dtype)
+        self.tbl.insert(arr)
+        data = self.tbl.select()
+        assert self.check(self.idata, data)
+
+    def test_insert_dict_of_arrays(self):
+        """Insert a dictionary of arrays"""
+        cols = self.idata_columns()
+        self.tbl.insert(dict(
+            (col, list(self.idata[:, i])) for i, col in enumerate(cols)))
+        data = self.tbl.select()
+        assert self.check(self.idata, data)
+
+    @raises(ValueError)
+    def test_insert_dict_of_arrays_bad_column(self):
+        """Insert a dictionary of arrays with an unknown column"""
+        self.tbl.insert({'foo': np.arange(4)})
+
+    def test_load_csv(self):
+        """Load a csv file written by save_csv"""
+        self.insert()
+        self.tbl.save_csv("test.csv")
+        self.tbl.delete()
+        count = self.tbl.load_csv("test.csv", chunksize=3)
+        os.remove("test.csv")
+        assert count == len(self.idata)
+        assert self.check(self.idata, self.tbl.select())
+
+    def test_create_from_csv(self):
+        """Create a table from a csv file written by save_csv"""
+        self.insert()
+        self.tbl.save_csv("test.csv")
+        tbl = Table.create_from_csv(
+            self.tbl.db, "Foo_2", "test.csv", chunksize=3,
+            primary_key=self.tbl.primary_key,
+            autoincrement=self.tbl.autoincrement)
+        os.remove("test.csv")
+        assert str(tbl) == str(self.tbl).replace("Foo", "Foo_2")
+        assert self.check(self.idata, tbl.select())
+
+    def test_csv_matches_select(self):
+        """Write the same csv file as the selected dataframe"""
+        self.insert()
+        self.tbl.select(where="age>24").to_csv("test.csv")
+        self.tbl.save_csv("test_stream.csv", where="age>24", chunksize=2)
+        with open("test.csv") as fh:
+            expected = fh.read()
+        with open("test_stream.csv") as fh:
+            assert fh.read() == expected
+        os.remove("test.csv")
+        os.remove("test_stream.csv")
+
+    def test_csv_gzip(self):
+        """Write a gzip-compressed csv file"""
+        self.insert()
+        self.tbl.save_csv("test.csv")
+        self.tbl.save_csv("test.csv.gz")
+        with open("test.csv", "rb") as fh:
+            expected = fh.read()
+        with gzip.open("test.csv.gz", "rb") as fh:
+            assert fh.read() == expected
+        os.remove("test.csv")
+        os.remove("test.csv.gz")
+
+    def test_load_csv_gzip(self):
+        """Load a gzip-compressed csv file written by save_csv"""
+        self.insert()
+        self.tbl.save_csv("test.csv.gz")
+        self.tbl.delete()
+        count = self.tbl.load_csv("test.csv.gz", chunksize=3)
+        tbl = Table.create_from_csv(
+            self.tbl.db, "Foo_2", "test.csv.gz",
+            primary_key=self.tbl.primary_key)
+        os.remove("test.csv.gz")
+        assert count == len(self.idata)
+        assert self.check(self.idata, self.tbl.select())
+        assert self.check(self.idata, tbl.select())
+
+    def test_save_columns(self):
+        """Save and reload binary column files"""
+        self.insert()
+        self.tbl.save_columns("test_columns")
+        self.tbl.delete()
+        assert self.tbl.load_columns("test_columns") == len(self.idata)
+        shutil.rmtree("test_columns")
+        assert self.check(self.idata, self.tbl.select())
+
+    def test_create_from_columns(self):
+        """Create a table from binary column files"""
+        self.insert()
+        self.tbl.save_columns("test_columns")
+        tbl = Table.create_from_columns(
+            self.tbl.db, "Foo_2", "test_columns")
+        shutil.rmtree("test_columns")
+        assert str(tbl) == str(self.tbl).replace("Foo", "Foo_2")
+        assert self.check(self.idata, tbl.select())
@@ -134,3 +134,69 @@ class TestTablePrimaryKey(TestTable):
         """Slice every other row"""
         self.insert()
         self.tbl[::2]
+
+    def test_update_many_frame(self):
+        """Update many rows from a selected dataframe"""
+        self.insert()
+        data = self.tbl.select()
+        data['age'] += 1
+        data['height'] = data['height'] * 2
+        self.tbl.update_many(data[['age', 'height']])
+        new = self.tbl.select()
+        assert list(new['age']) == list(data['age'])
+        assert list(new['height']) == list(data['height'])
+        assert list(new['name']) == list(data['name'])
+
+    def test_update_many_dicts(self):
+        """Update many rows by primary key"""
+        self.insert()
+        ids = list(self.tbl.select().index)
+        self.tbl.update_many([
+            {'id': ids[0], 'name': 'Alyssa Hacker', 'age': 26},
+            {'id': ids[2], 'name': 'Louis R.', 'age': 27}])
+        data = self.tbl.select()
+        assert list(data['name'])[0] == 'Alyssa Hacker'
+        assert list(data['name'])[2] == 'Louis R.'
+        assert list(data['age']) == [26, 24, 27, 29]
+
+    def test_upsert(self):
+        """Insert new rows and update existing rows"""
+        self.tbl.insert([
+            [1, 'Alyssa P. Hacker', 25, 66.25],
+            [2, 'Ben Bitdiddle', 24, 70.1]])
+        self.tbl.upsert([
+            [2, 'Ben Bitdiddle', 25, 70.2],
+            [3, 'Louis Reasoner', 26, 68.0]])
+        data = self.tbl.select()
+        assert list(data.index) == [1, 2, 3]
+        assert list(data['age']) == [25, 25, 26]
+        assert list(data['height']) == [66.25, 70.2, 68.0]
+
+    def test_upsert_update_columns(self):
+        """Upsert only some of the columns"""
+        self.tbl.insert([[1, 'Alyssa P. Hacker', 25, 66.25]])
+        self.tbl.upsert(
+            {'id': 1, 'name': 'Alyssa Hacker', 'age': 26, 'height': 0.0},
+            update_columns=['age'])
+        data = self.tbl.select()
+        assert list(data['name']) == ['Alyssa P. Hacker']
+        assert list(data['age']) == [26]
+        assert list(data['height']) == [66.25]
+
+    def test_upsert_nothing(self):
+        """Upsert without updating existing rows"""
+        self.tbl.insert([[1, 'Alyssa P. Hacker', 25, 66.25]])
+        self.tbl.upsert(
+            [[1, 'Alyssa Hacker', 26, 0.0], [2, 'Ben Bitdiddle', 24, 70.1]],
+            update_columns=[])
+        data = self.tbl.select()
+        assert list(data['name']) == ['Alyssa P. Hacker', 'Ben Bitdiddle']
+
+    def test_delete_keys_many(self):
+        """Delete more keys than SQLite accepts parameters"""
+        self.tbl.insert([[i, 'Alyssa P. Hacker', 25, 66.25]
+                         for i in xrange(1, 2501)])
+        count = self.tbl.delete_keys(np.arange(2, 2501, 2))
+        assert count == 1250
+        data = self.tbl.select()
+        assert list(data.index) == list(xrange(1, 2501, 2))
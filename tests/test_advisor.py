@@ -0,0 +1,67 @@
+from dbtools import Table
+from dbtools.advisor import IndexAdvisor, where_columns
+from dbtools.where import col
+
+
+def create(advisor):
+    tbl = Table.create(
+        ':memory:', "Foo",
+        [('id', int), ('subject', int), ('name', str), ('age', int)],
+        primary_key='id')
+    tbl.insert([[i, i % 10, str(i), i % 50] for i in range(200)])
+    return Table(tbl.db, "Foo", advisor=advisor)
+
+
+def test_where_columns():
+    """Find the columns used in a conditional"""
+    columns = ('id', 'subject', 'name', 'age')
+    assert where_columns("age>25 AND subject=?", columns) == (
+        'age', 'subject')
+    assert where_columns("name='age' OR age=1 OR age=2", columns) == (
+        'name', 'age')
+
+
+def test_advisor_scan():
+    """Suggest indexes for columns that are filtered by scanning"""
+    advisor = IndexAdvisor(threshold=0)
+    tbl = create(advisor)
+    tbl.select(where=("subject=?", 3))
+    tbl.select(where=("subject=?", 4))
+    tbl.select(where="id<10")
+    tbl.select()
+
+    advice = advisor.advice()
+    assert len(advice) == 1
+    assert advice[0].table == "Foo"
+    assert advice[0].columns == ('subject',)
+    assert advice[0].selects == 2
+
+    # with an index, the selects become searches
+    tbl.create_index(advice[0].columns)
+    advisor.clear()
+    tbl.select(where=("subject=?", 3))
+    assert advisor.advice() == []
+
+
+def test_advisor_threshold():
+    """Check that fast selects are counted, but not explained"""
+    advisor = IndexAdvisor(threshold=60)
+    tbl = create(advisor)
+    tbl.select(where=("subject=?", 3))
+    assert advisor.advice() == []
+    assert list(advisor._usage.values())[0][:1] == [1]
+
+
+def test_advisor_isin():
+    """Check that a long isin list is only stored once per select"""
+    advisor = IndexAdvisor(threshold=0)
+    tbl = create(advisor)
+    statements = []
+    tbl.db.set_trace_callback(statements.append)
+    try:
+        data = tbl.select(where=col('age').isin(list(range(0, 50, 2)) * 5))
+    finally:
+        tbl.db.set_trace_callback(None)
+    assert len(data) == 100
+    assert len([s for s in statements if s.startswith("INSERT")]) == 125
+    assert advisor.advice()[0].columns == ('age',)
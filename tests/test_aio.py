@@ -0,0 +1,45 @@
+import sys
+
+from nose.tools import raises
+from unittest import SkipTest
+
+if sys.version_info < (3, 5):
+    raise SkipTest("dbtools.aio needs Python 3.5 or later")
+
+import asyncio
+
+from . import remove_db
+from . import aio_cases
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_async_memory():
+    """Create, insert and select asynchronously in memory"""
+    run(aio_cases.memory())
+
+
+def test_async_path():
+    """Open a table by path, and run it off the event loop thread"""
+    remove_db()
+    try:
+        run(aio_cases.path())
+    finally:
+        remove_db()
+
+
+def test_async_iter_select():
+    """Stream chunks asynchronously"""
+    run(aio_cases.iter_select())
+
+
+@raises(ValueError)
+def test_async_missing():
+    """Check that opening a missing table fails when awaited"""
+    run(aio_cases.missing())
@@ -0,0 +1,83 @@
+import sqlite3
+
+from dbtools import Table
+from dbtools.cache import ResultCache
+from dbtools.where import col
+from . import DBNAME, remove_db
+
+
+def create(db):
+    tbl = Table.create(
+        db, "Foo", [('id', int), ('name', str), ('age', int)],
+        primary_key='id')
+    tbl.insert([[1, 'Alyssa', 25], [2, 'Ben', 24]])
+    return Table(tbl.db, "Foo", cache=True)
+
+
+def test_cache_hit():
+    """Check that repeated selects are cached, and return copies"""
+    tbl = create(':memory:')
+    data = tbl['name', 'age']
+    data['age'] = 0
+    assert tbl.cache.misses == 1
+    again = tbl['name', 'age']
+    assert tbl.cache.hits == 1
+    assert list(again['age']) == [25, 24]
+    assert tbl[:2].equals(tbl[:2])
+    assert tbl.cache.hits == 2
+    assert tbl.cache.misses == 2
+
+
+def test_cache_invalidate():
+    """Check that writes on the same connection invalidate results"""
+    tbl = create(':memory:')
+    other = Table(tbl.db, "Foo")
+    assert other.cache is None
+    assert len(tbl.select()) == 2
+    other.insert([3, 'Cy', 26])
+    assert len(tbl.select()) == 3
+    tbl.update({'age': 27}, where="id=3")
+    assert tbl[3]['age'][3] == 27
+    tbl.delete(where="id=3")
+    assert len(tbl.select()) == 2
+    assert tbl.cache.hits == 0
+
+
+def test_cache_isin():
+    """Cache selects with long isin lists, without invalidating others"""
+    tbl = create(':memory:')
+    tbl.insert([[i, str(i), i % 50] for i in range(3, 300)])
+    young = tbl.select(where="age<10")
+    for i in range(2):
+        assert len(tbl.select(where=col('id').isin(range(200)))) == 199
+        assert len(tbl.select(where=col('id').isin(range(100, 300)))) == 200
+    assert tbl.select(where="age<10").equals(young)
+    assert tbl.cache.misses == 3
+    assert tbl.cache.hits == 3
+
+
+def test_cache_external():
+    """Check that commits by other connections invalidate results"""
+    remove_db()
+    tbl = create(DBNAME)
+    assert len(tbl.select()) == 2
+    external = Table(sqlite3.connect(DBNAME), "Foo")
+    external.insert([3, 'Cy', 26])
+    assert len(tbl.select()) == 3
+    external.db.close()
+    remove_db()
+
+
+def test_cache_size():
+    """Check that the least recently used results are discarded"""
+    tbl = create(':memory:')
+    size = tbl.select().memory_usage(index=True, deep=True).sum()
+    tbl.cache.maxbytes = int(size * 1.5)
+    tbl.select()
+    tbl.select('name')
+    assert len(tbl.cache) == 1
+    assert tbl.cache.nbytes <= tbl.cache.maxbytes
+
+    cache = ResultCache(maxbytes=1)
+    cache.put('key', 0, tbl.select())
+    assert len(cache) == 0
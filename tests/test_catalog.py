@@ -0,0 +1,116 @@
+import os
+import sqlite3
+
+from dbtools import Table
+from dbtools.catalog import get_catalog
+from dbtools.connection import connect
+from . import DBNAME
+
+
+def test_catalog_shared():
+    """Check that tables on a connection share one catalog"""
+    tbl = Table.create(':memory:', "foo", [('id', int)], verbose=True)
+    catalog = get_catalog(tbl.db)
+    assert get_catalog(tbl.db) is catalog
+    assert catalog.tables() == ["foo"]
+
+
+def test_catalog_cached():
+    """Check that the schema is not reloaded if it has not changed"""
+    tbl = Table.create(':memory:', "foo", [('id', int)], verbose=True)
+    catalog = get_catalog(tbl.db)
+    tables = catalog._load()
+    Table(tbl.db, "foo", verbose=True)
+    assert catalog._load() is tables
+    assert catalog.schema("foo") is catalog.schema("foo")
+
+
+def test_catalog_create_drop():
+    """Check that the catalog is updated by create and drop"""
+    tbl = Table.create(':memory:', "foo", [('id', int)], verbose=True)
+    catalog = get_catalog(tbl.db)
+    assert catalog.exists("foo")
+    tbl2 = Table.create(tbl.db, "bar", [('id', int)], verbose=True)
+    assert catalog.tables() == ["foo", "bar"]
+    tbl2.drop()
+    assert catalog.tables() == ["foo"]
+
+
+def test_catalog_schema_version():
+    """Check that the catalog notices changes from other connections"""
+    if os.path.exists(DBNAME):
+        os.remove(DBNAME)
+    conn = connect(DBNAME)
+    Table.create(conn, "foo", [('id', int)], verbose=True)
+    assert get_catalog(conn).tables() == ["foo"]
+    other = sqlite3.connect(DBNAME)
+    other.execute("CREATE TABLE bar(id INTEGER)")
+    other.close()
+    assert get_catalog(conn).tables() == ["foo", "bar"]
+    assert Table(conn, "bar").columns == ("id",)
+    os.remove(DBNAME)
+
+
+def test_catalog_plain_connection():
+    """Check that plain sqlite3 connections are supported"""
+    conn = sqlite3.connect(':memory:')
+    tbl = Table.create(conn, "foo", [('id', int)], verbose=True)
+    assert get_catalog(conn) is get_catalog(conn)
+    assert Table.list_tables(conn) == ["foo"]
+    assert tbl.columns == ("id",)
+
+    # the schema is only read once
+    statements = []
+    conn.set_trace_callback(statements.append)
+    Table(conn, "foo")
+    tbl.indexes
+    conn.set_trace_callback(None)
+    assert set(statements) == set(["PRAGMA schema_version"])
+
+
+def test_schema():
+    """Read the schema of a table with constraints and an index"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute(
+        'CREATE TABLE foo(id INTEGER PRIMARY KEY AUTOINCREMENT, '
+        'name TEXT NOT NULL DEFAULT \'a, b\', "the age" integer, '
+        'height REAL, UNIQUE (name, height))')
+    conn.execute('CREATE INDEX foo_age ON foo("the age")')
+    tbl = Table(conn, "foo", verbose=True)
+    assert tbl.columns == ("id", "name", "the age", "height")
+    assert tbl.types == ("INTEGER", "TEXT", "INTEGER", "REAL")
+    assert tbl.primary_key == "id"
+    assert tbl.autoincrement
+
+    schema = tbl.schema
+    assert schema.columns[1].notnull
+    assert schema.columns[1].default == "'a, b'"
+    assert not schema.columns[2].notnull
+    indexes = dict((idx.name, idx) for idx in schema.indexes)
+    assert indexes["foo_age"].columns == ("the age",)
+    assert not indexes["foo_age"].unique
+    assert [idx.columns for idx in schema.indexes if idx.unique] == [
+        ("name", "height")]
+
+
+def test_schema_no_primary_key():
+    """Read the schema of a table without a primary key"""
+    tbl = Table.create(
+        ':memory:', "foo", [('id', int), ('name', str)], verbose=True)
+    assert tbl.schema.primary_key is None
+    assert not tbl.schema.autoincrement
+    assert tbl.schema.indexes == ()
+    assert str(tbl) == "foo(id INTEGER, name TEXT)"
+
+
+def test_schema_composite_key():
+    """Read the schema of a table with a primary key of two columns"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute(
+        'CREATE TABLE foo(a INTEGER, b TEXT, c REAL, PRIMARY KEY (a, b))')
+    conn.execute("INSERT INTO foo VALUES (1, 'x', 0.5)")
+    tbl = Table(conn, "foo")
+    assert tbl.primary_key is None
+    assert not tbl.autoincrement
+    assert [col.pk for col in tbl.schema.columns] == [1, 2, 0]
+    assert tbl.select().values.tolist() == [[1, 'x', 0.5]]
@@ -0,0 +1,36 @@
+import numpy as np
+import shutil
+
+from dbtools import Table
+from dbtools.columns import read_columns
+
+
+def test_read_columns():
+    """Memory-map saved columns with missing values"""
+    tbl = Table.create(
+        ':memory:', "Foo",
+        [('id', int), ('name', str), ('age', int), ('data', bytes)],
+        primary_key='id', verbose=True)
+    tbl.insert([
+        [1, 'Alyssa P. Hacker', 25, b'\x00\x01'],
+        [2, None, None, b'\x02']])
+    tbl.save_columns("test_columns")
+    schema, arrays = read_columns("test_columns")
+
+    assert schema['name'] == "Foo"
+    assert schema['primary_key'] == 'id'
+    assert schema['rows'] == 2
+    assert list(arrays.keys()) == ['id', 'name', 'age', 'data']
+
+    assert isinstance(arrays['id'], np.memmap)
+    assert arrays['id'].dtype == np.int64
+    assert arrays['age'].dtype == np.int64
+    assert arrays['age'].tolist() == [25, None]
+    assert arrays['name'].tolist() == ['Alyssa P. Hacker', None]
+    assert list(arrays['data']) == [b'\x00\x01', b'\x02']
+
+    tbl2 = Table.create_from_columns(tbl.db, "Foo_2", "test_columns")
+    shutil.rmtree("test_columns")
+    data = tbl2.select()
+    assert list(data['data']) == [b'\x00\x01', b'\x02']
+    assert np.isnan(data['age'][2])
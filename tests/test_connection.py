@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+
+from nose.tools import raises
+from sqlite3 import OperationalError
+
+from dbtools import Table, ConnectionPool
+from dbtools.connection import Connection
+from . import DBNAME
+
+
+def test_pool_reuse():
+    """Check that connections are reused for the same path"""
+    with ConnectionPool() as pool:
+        conn = pool.connect(DBNAME)
+        assert isinstance(conn, Connection)
+        assert pool.connect(DBNAME) is conn
+        assert len(pool) == 1
+    os.remove(DBNAME)
+
+
+def test_pool_memory():
+    """Check that in-memory connections are not cached"""
+    with ConnectionPool() as pool:
+        assert pool.connect(':memory:') is not pool.connect(':memory:')
+        assert len(pool) == 0
+
+
+def test_pool_threads():
+    """Check that each thread gets its own connection"""
+    conns = []
+    with ConnectionPool() as pool:
+        thread = threading.Thread(
+            target=lambda: conns.append(pool.connect(DBNAME)))
+        thread.start()
+        thread.join()
+        assert pool.connect(DBNAME) is not conns[0]
+        assert len(pool) == 2
+    os.remove(DBNAME)
+
+
+def test_pool_size():
+    """Check that the least recently used connection is released"""
+    with ConnectionPool(size=1) as pool:
+        conn = pool.connect(DBNAME)
+        pool.connect("test2.db")
+        assert len(pool) == 1
+        assert pool.connect(DBNAME) is not conn
+    os.remove(DBNAME)
+    os.remove("test2.db")
+
+
+def test_pool_idle_timeout():
+    """Check that idle connections are released"""
+    with ConnectionPool(idle_timeout=0.01) as pool:
+        conn = pool.connect(DBNAME)
+        time.sleep(0.05)
+        assert pool.connect(DBNAME) is not conn
+        assert len(pool) == 1
+    os.remove(DBNAME)
+
+
+def test_pool_deleted():
+    """Check that connections to deleted databases are not reused"""
+    with ConnectionPool() as pool:
+        conn = pool.connect(DBNAME)
+        os.remove(DBNAME)
+        assert pool.connect(DBNAME) is not conn
+    os.remove(DBNAME)
+
+
+def test_pool_close():
+    """Check that closing the pool closes its connections"""
+    pool = ConnectionPool()
+    Table.create(pool.connect(DBNAME), "foo", [('id', int)], verbose=True)
+    assert len(pool) == 1
+    pool.close()
+    assert len(pool) == 0
+    assert Table.exists(pool.connect(DBNAME), "foo", verbose=True)
+    pool.close()
+    os.remove(DBNAME)
+
+
+def test_table_shares_connection():
+    """Check that tables on the same path share a connection"""
+    tbl = Table.create(DBNAME, "foo", [('id', int)], verbose=True)
+    assert Table(DBNAME, "foo", verbose=True).db is tbl.db
+    os.remove(DBNAME)
+
+
+def test_pool_readonly():
+    """Check that read-only connections are separate and cannot write"""
+    Table.create(DBNAME, "Foo", [('id', int)]).insert([[1], [2]])
+    with ConnectionPool() as pool:
+        conn = pool.connect(DBNAME, readonly=True)
+        assert pool.connect(DBNAME, readonly=True) is conn
+        assert pool.connect(DBNAME) is not conn
+        assert len(pool) == 2
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] > 0
+
+        tbl = Table(conn, "Foo")
+        assert list(tbl.select()['id']) == [1, 2]
+    os.remove(DBNAME)
+
+
+@raises(OperationalError)
+def test_pool_readonly_write():
+    """Check that read-only connections cannot write"""
+    Table.create(DBNAME, "Foo", [('id', int)])
+    try:
+        with ConnectionPool() as pool:
+            Table(pool.connect(DBNAME, readonly=True), "Foo").insert([1])
+    finally:
+        os.remove(DBNAME)
+
+
+def test_table_readonly():
+    """Open a table read-only from a path"""
+    Table.create(DBNAME, "Foo", [('id', int)]).insert([[1], [2]])
+    tbl = Table(DBNAME, "Foo", readonly=True)
+    assert tbl.db is not Table(DBNAME, "Foo").db
+    assert list(tbl.select()['id']) == [1, 2]
+    os.remove(DBNAME)
+
+
+def test_table_readonly_modified():
+    """Check that read-only connections are not reused after a write"""
+    tbl = Table.create(DBNAME, "Foo", [('id', int)])
+    tbl.insert([[1], [2]])
+    assert list(Table(DBNAME, "Foo", readonly=True).select()['id']) == [1, 2]
+    tbl.insert([[i] for i in range(3, 1001)])
+    data = Table(DBNAME, "Foo", readonly=True).select()
+    assert list(data['id']) == list(range(1, 1001))
+    os.remove(DBNAME)
+
+
+@raises(ValueError)
+def test_pool_readonly_memory():
+    """Check that in-memory databases cannot be read-only"""
+    ConnectionPool().connect(':memory:', readonly=True)
@@ -0,0 +1,74 @@
+
+from nose.tools import raises
+
+from dbtools import Table
+from dbtools.connection import connect
+from dbtools.profiles import Profile, get_pragmas, profiles
+from . import DBNAME, remove_db
+
+
+def pragmas(conn):
+    return dict(get_pragmas(conn, ['journal_mode', 'synchronous']))
+
+
+def test_profile_restore():
+    """Check that profiles restore the previous settings"""
+    remove_db()
+    conn = connect(DBNAME)
+    before = pragmas(conn)
+    with Profile(conn, "bulk_load"):
+        assert pragmas(conn) == {'journal_mode': 'memory', 'synchronous': 0}
+    assert pragmas(conn) == before
+    remove_db()
+
+
+def test_profile_connect():
+    """Apply a profile to a connection"""
+    remove_db()
+    conn = connect(DBNAME, profile="wal_concurrent")
+    assert pragmas(conn) == {'journal_mode': 'wal', 'synchronous': 1}
+    connect(conn, profile="safe")
+    assert pragmas(conn) == {'journal_mode': 'delete', 'synchronous': 2}
+    remove_db()
+
+
+def test_profile_table():
+    """Use profiles with Table.create and Table.profile"""
+    remove_db()
+    tbl = Table.create(
+        DBNAME, "Foo", [('id', int), ('x', float)], profile="safe")
+    before = pragmas(tbl.db)
+    with tbl.profile("bulk_load"):
+        tbl.insert([[i, i / 2.0] for i in range(100)])
+    assert pragmas(tbl.db) == before
+    assert len(tbl.select()) == 100
+
+    tbl2 = Table(DBNAME, "Foo", profile={'synchronous': 'OFF'})
+    assert pragmas(tbl2.db)['synchronous'] == 0
+    remove_db()
+
+
+def test_profile_unpooled():
+    """Check that profiled tables do not change pooled connections"""
+    remove_db()
+    tbl = Table.create(DBNAME, "Foo", [('id', int)])
+    before = pragmas(tbl.db)
+    bulk = Table(DBNAME, "Foo", profile="bulk_load")
+    assert bulk.db is not tbl.db
+    assert pragmas(bulk.db)['synchronous'] == 0
+    assert pragmas(Table(DBNAME, "Foo").db) == before
+    assert connect(DBNAME, profile="bulk_load") is not connect(DBNAME)
+    remove_db()
+
+
+def test_profile_names():
+    """Check that all profiles set the same PRAGMAs"""
+    names = set(profiles['safe'].keys())
+    for profile in profiles.values():
+        assert set(profile.keys()) == names
+
+
+@raises(ValueError)
+def test_profile_invalid():
+    """Check that unknown profiles are rejected"""
+    Profile(connect(':memory:'), "fast")
@@ -1,7 +1,15 @@
+import numpy as np
 import os
+import pandas as pd
+import sqlite3
+
+from nose.tools import raises
 
 from dbtools import Table
-from . import DBNAME
+from dbtools.connection import default_pool
+from dbtools.table import _select_partition
+from dbtools.where import col
+from . import DBNAME, remove_db
 
 
 def test_not_exists_no_db():
@@ -33,3 +41,340 @@ def test_list_tables():
     assert tables == ["foo", "bar"], tables
     assert Table.exists(DBNAME, 'foo', verbose=True)
     os.remove(DBNAME)
+
+
+def test_create_from_dataframe_columns():
+    """Create a table from a dataframe with typed and missing values"""
+    df = pd.DataFrame({
+        'name': ['Alyssa P. Hacker', None, 'Louis Reasoner'],
+        'age': np.array([25, 24, 26], dtype='int32'),
+        'height': [66.25, np.nan, 68.0]},
+        columns=['name', 'age', 'height'],
+        index=pd.Index([2, 4, 6], name='id'))
+    tbl = Table.create(':memory:', "Foo", df, verbose=True)
+    assert tbl.primary_key == 'id'
+    assert str(tbl) == ("Foo(id INTEGER PRIMARY KEY, name TEXT, "
+                        "age INTEGER, height REAL)")
+    data = tbl.select()
+    assert list(data.index) == [2, 4, 6]
+    assert list(data['age']) == [25, 24, 26]
+    assert pd.isnull(data['name'][4])
+    assert np.isnan(data['height'][4])
+
+
+def test_select_numeric():
+    """Select typed arrays from a numeric table"""
+    tbl = Table.create(
+        ':memory:', "Foo", [('id', int), ('age', int), ('height', float)],
+        primary_key='id', verbose=True)
+    tbl.insert([[1, 25, 66.25], [2, 24, None], [3, 26, 68.0]])
+    data = tbl.select()
+    assert data.index.name == 'id'
+    assert data['age'].dtype == np.int64
+    assert data['height'].dtype == np.float64
+    assert np.isnan(data['height'][2])
+    chunks = pd.concat(list(tbl.iter_select(chunksize=2)))
+    assert list(chunks.index) == list(data.index)
+    assert chunks['age'].dtype == np.int64
+    assert list(chunks['age']) == list(data['age'])
+
+
+def test_select_numeric_null():
+    """Select integers with missing values from a numeric table"""
+    tbl = Table.create(
+        ':memory:', "Foo", [('age', int), ('height', float)], verbose=True)
+    tbl.insert([[25, 66.25], [None, 70.1]])
+    data = tbl.select()
+    assert data['age'].dtype == np.float64
+    assert data['age'][0] == 25
+    assert np.isnan(data['age'][1])
+
+
+def test_create_from_csv_dtypes():
+    """Create a table from a csv file with given datatypes"""
+    with open("test.csv", "w") as fh:
+        fh.write("code,count\n007,1\n042,2\n")
+    tbl = Table.create_from_csv(
+        ':memory:', "Foo", "test.csv", primary_key='id',
+        dtypes=[('code', str), ('count', int)], verbose=True)
+    os.remove("test.csv")
+    assert str(tbl) == "Foo(id INTEGER PRIMARY KEY, code TEXT, count INTEGER)"
+    data = tbl.select()
+    assert list(data.index) == [1, 2]
+    assert list(data['code']) == ['007', '042']
+
+
+def test_parallel_select():
+    """Select a table in several processes"""
+    if os.path.exists(DBNAME):
+        os.remove(DBNAME)
+    tbl = Table.create(
+        DBNAME, "Foo", [('id', int), ('name', str), ('age', int)],
+        primary_key='id')
+    tbl.insert([[i, str(i), i % 7] for i in range(1, 101)])
+    data = tbl.parallel_select(partitions=3)
+    assert data.equals(tbl.select())
+    data = tbl.parallel_select('age', where=("age>?", 3), partitions=4)
+    assert data.equals(tbl.select('age', where=("age>?", 3)))
+    os.remove(DBNAME)
+
+
+def test_parallel_select_rowid():
+    """Select a table without a primary key in several processes"""
+    if os.path.exists(DBNAME):
+        os.remove(DBNAME)
+    tbl = Table.create(DBNAME, "Foo", [('name', str), ('age', int)])
+    tbl.insert([[str(i), i % 7] for i in range(50)])
+    data = tbl.parallel_select(where="age<5", partitions=4)
+    assert data.equals(tbl.select(where="age<5"))
+    os.remove(DBNAME)
+
+
+def test_parallel_select_text_key():
+    """Select a table with a non-integer primary key in several processes"""
+    remove_db()
+    conn = sqlite3.connect(DBNAME)
+    conn.execute("CREATE TABLE Foo(k TEXT PRIMARY KEY, x REAL)")
+    conn.executemany("INSERT INTO Foo VALUES (?, ?)",
+                     [("k%02d" % i, i / 2.0) for i in range(30)])
+    conn.execute("CREATE TABLE Bar(x REAL PRIMARY KEY)")
+    conn.executemany("INSERT INTO Bar VALUES (?)",
+                     [(i / 2.0,) for i in range(30)])
+    conn.commit()
+    conn.close()
+    for name in ("Foo", "Bar"):
+        tbl = Table(DBNAME, name)
+        data = tbl.parallel_select(where="x>2", partitions=3)
+        assert data.equals(tbl.select(where="x>2"))
+    remove_db()
+
+
+@raises(ValueError)
+def test_parallel_select_batch():
+    """Check that tables cannot be selected in parallel in a batch"""
+    remove_db()
+    tbl = Table.create(DBNAME, "Foo", [('id', int)], primary_key='id')
+    try:
+        with tbl.batch():
+            tbl.insert([[i] for i in range(10)])
+            tbl.parallel_select(partitions=2)
+    finally:
+        remove_db()
+
+
+def test_parallel_select_unpooled():
+    """Check that partitions are selected on their own connections"""
+    if os.path.exists(DBNAME):
+        os.remove(DBNAME)
+    tbl = Table.create(DBNAME, "Foo", [('id', int)], primary_key='id')
+    tbl.insert([[i] for i in range(10)])
+    default_pool.close()
+    data = _select_partition((DBNAME, "Foo", None, col('id') < 5))
+    assert list(data.index) == list(range(5))
+    assert len(default_pool) == 0
+    os.remove(DBNAME)
+
+
+@raises(ValueError)
+def test_parallel_select_memory():
+    """Check that in-memory tables cannot be selected in parallel"""
+    tbl = Table.create(':memory:', "Foo", [('id', int)], primary_key='id')
+    tbl.insert([[1], [2]])
+    tbl.parallel_select(partitions=2)
+
+
+def test_create_index():
+    """Create and drop indexes"""
+    tbl = Table.create(
+        ':memory:', "Foo", [('id', int), ('name', str), ('age', int)],
+        primary_key='id', verbose=True)
+    assert tbl.indexes == ()
+    name = tbl.create_index(['name', 'age'])
+    assert name == "Foo_name_age_idx"
+    tbl.create_index('age', unique=True, name="age_idx")
+    indexes = dict((idx.name, idx) for idx in tbl.indexes)
+    assert indexes[name].columns == ('name', 'age')
+    assert not indexes[name].unique
+    assert indexes["age_idx"].columns == ('age',)
+    assert indexes["age_idx"].unique
+
+    # creating an existing index does nothing
+    tbl.create_index(['name', 'age'])
+    assert len(tbl.indexes) == 2
+
+    tbl.drop_index(['name', 'age'])
+    tbl.drop_index("age_idx")
+    assert tbl.indexes == ()
+
+
+@raises(ValueError)
+def test_create_index_bad_column():
+    """Check that indexes on unknown columns are rejected"""
+    tbl = Table.create(':memory:', "Foo", [('id', int)])
+    tbl.create_index('age')
+
+
+@raises(ValueError)
+def test_drop_index_missing():
+    """Check that dropping a missing index fails"""
+    tbl = Table.create(':memory:', "Foo", [('id', int)])
+    tbl.drop_index(['id'])
+
+
+def aggregate_data():
+    rows = [
+        [1, 1, 1, 0.5],
+        [2, 1, 2, 0.75],
+        [3, 2, 1, 1.0],
+        [4, 2, 1, 1.5],
+        [5, 2, 2, None],
+        [6, 3, 1, 2.0],
+        [7, None, 1, 3.0]]
+    tbl = Table.create(
+        ':memory:', "Foo",
+        [('trial', int), ('subject', int), ('block', int), ('rt', float)],
+        primary_key='trial', verbose=True)
+    tbl.insert(rows)
+    data = pd.DataFrame.from_records(
+        rows, columns=['trial', 'subject', 'block', 'rt'], index='trial',
+        coerce_float=True)
+    return tbl, data
+
+
+def test_aggregate():
+    """Aggregate groups in SQLite like pandas"""
+    tbl, data = aggregate_data()
+    funcs = ['count', 'sum', 'mean', 'min', 'max', 'var', 'std']
+    agg = tbl.aggregate(by='subject', agg={'rt': funcs})
+    expected = data.groupby('subject').agg({'rt': funcs})
+    assert list(agg.index) == list(expected.index)
+    assert agg.index.name == 'subject'
+    assert list(agg.columns) == list(expected.columns)
+    assert np.allclose(agg.values.astype(float),
+                       expected.values.astype(float), equal_nan=True)
+
+
+def test_aggregate_flat():
+    """Aggregate with one function per column, and several groups"""
+    tbl, data = aggregate_data()
+    agg = tbl.aggregate(
+        by=['subject', 'block'], agg={'rt': 'mean', 'trial': 'count'},
+        where="rt<2.5")
+    expected = data[data['rt'] < 2.5].reset_index().groupby(
+        ['subject', 'block']).agg({'rt': 'mean', 'trial': 'count'})
+    assert list(agg.columns) == ['rt', 'trial']
+    assert agg.index.names == ['subject', 'block']
+    assert list(agg.index) == list(expected.index)
+    assert np.allclose(agg['rt'], expected['rt'])
+    assert list(agg['trial']) == list(expected['trial'])
+
+
+def test_aggregate_all():
+    """Aggregate the whole table"""
+    tbl, data = aggregate_data()
+    agg = tbl.aggregate(agg={'rt': ['max', 'count']})
+    assert len(agg) == 1
+    assert agg[('rt', 'max')][0] == 3.0
+    assert agg[('rt', 'count')][0] == 6
+
+
+def test_aggregate_var_precision():
+    """Compute variances of large values like pandas"""
+    rows = [[i, i % 2, 1e9 + [0.1, 0.2, 0.3][i % 3], 3000000000 + i]
+            for i in range(30)]
+    tbl = Table.create(
+        ':memory:', "Foo",
+        [('id', int), ('subject', int), ('x', float), ('n', int)],
+        primary_key='id')
+    tbl.insert(rows)
+    data = pd.DataFrame.from_records(
+        rows, columns=['id', 'subject', 'x', 'n'], index='id')
+    agg = {'x': ['var', 'std'], 'n': ['var', 'std']}
+    for by in ('subject', None):
+        if by is None:
+            expected = data.agg(agg).T.stack().values
+            values = tbl.aggregate(agg=agg).values[0]
+        else:
+            expected = data.groupby(by).agg(agg).values
+            values = tbl.aggregate(by=by, agg=agg).values
+        assert np.allclose(values, expected, rtol=1e-6)
+
+
+@raises(ValueError)
+def test_aggregate_invalid():
+    """Check that unknown aggregation functions are rejected"""
+    tbl, data = aggregate_data()
+    tbl.aggregate(by='subject', agg={'rt': 'median'})
+
+
+def paging_table():
+    tbl = Table.create(
+        ':memory:', "Foo", [('id', int), ('name', str), ('age', int)],
+        primary_key='id', verbose=True)
+    tbl.insert([[i, "name%02d" % i, i % 5] for i in range(1, 26)])
+    return tbl
+
+
+def test_select_order_limit():
+    """Select with ORDER BY, LIMIT and OFFSET"""
+    tbl = paging_table()
+    data = tbl.select(order_by=['-age', 'name'], limit=3)
+    assert list(data.index) == [4, 9, 14]
+    data = tbl.select('name', where="age=0", order_by='-id', offset=2)
+    assert list(data.index) == [15, 10, 5]
+    data = tbl.select(order_by='id', limit=4, offset=20)
+    assert list(data.index) == [21, 22, 23, 24]
+    chunks = list(tbl.select(order_by='-id', limit=5, chunksize=2))
+    assert [list(chunk.index) for chunk in chunks] == [
+        [25, 24], [23, 22], [21]]
+
+
+def test_pages():
+    """Page through a table by primary key"""
+    tbl = paging_table()
+    pages = list(tbl.pages(10))
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert pd.concat(pages).equals(tbl.select())
+
+    pages = list(tbl.pages(3, where="age>2", order_by='-id'))
+    assert list(pd.concat(pages).index) == list(
+        tbl.select(where="age>2", order_by='-id').index)
+
+    # exactly one full page
+    pages = list(tbl.pages(5, where="age=1"))
+    assert len(pages) == 1
+    assert list(pages[0].index) == [1, 6, 11, 16, 21]
+
+
+def test_pages_column():
+    """Page through a table by a unique column"""
+    tbl = paging_table()
+    pages = list(tbl.pages(7, columns='age', order_by='name'))
+    assert [len(page) for page in pages] == [7, 7, 7, 4]
+    assert list(pages[0].columns) == ['age', 'name']
+    assert list(pd.concat(pages).index) == list(range(1, 26))
+
+
+@raises(ValueError)
+def test_pages_null():
+    """Check that paging by a column with NULL values fails"""
+    tbl = paging_table()
+    tbl.update({'name': None}, where="id=7")
+    list(tbl.pages(5, order_by='name'))
+
+
+@raises(ValueError)
+def test_pages_null_descending():
+    """Check that paging down a column with NULL values fails"""
+    tbl = paging_table()
+    tbl.update({'name': None}, where="id=7")
+    # rows with NULL values can be left out
+    pages = list(tbl.pages(5, where="id>7", order_by='-name'))
+    assert list(pd.concat(pages).index) == list(range(25, 7, -1))
+    list(tbl.pages(5, order_by='-name'))
+
+
+@raises(ValueError)
+def test_select_order_invalid():
+    """Check that ordering by unknown columns fails"""
+    paging_table().select(order_by='height')
@@ -0,0 +1,103 @@
+import sqlite3
+
+from nose.tools import raises
+
+from dbtools import Table, transaction
+from dbtools.transaction import get_transaction
+from dbtools.where import col
+from . import DBNAME, remove_db
+
+
+def count(path, name):
+    conn = sqlite3.connect(path)
+    n = conn.execute("SELECT COUNT(*) FROM %s" % name).fetchone()[0]
+    conn.close()
+    return n
+
+
+def make_table():
+    remove_db()
+    return Table.create(
+        DBNAME, "foo", [('id', int), ('name', str)], verbose=True)
+
+
+def test_batch_commit():
+    """Check that writes in a batch are committed at the end"""
+    tbl = make_table()
+    with tbl.batch():
+        tbl.insert([1, 'Alyssa P. Hacker'])
+        tbl.insert([2, 'Ben Bitdiddle'])
+        tbl.update({'name': 'Alyssa Hacker'}, where="id=1")
+        assert count(DBNAME, "foo") == 0
+    assert count(DBNAME, "foo") == 2
+    assert get_transaction(tbl.db) is None
+    remove_db()
+
+
+def test_batch_rollback():
+    """Check that writes in a failed batch are rolled back"""
+    tbl = make_table()
+    tbl.insert([1, 'Alyssa P. Hacker'])
+    try:
+        with tbl.batch():
+            tbl.insert([2, 'Ben Bitdiddle'])
+            tbl.delete(where="id=1")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert list(tbl.select()['id']) == [1]
+    remove_db()
+
+
+def test_batch_flush_every():
+    """Check that a batch is flushed every N writes"""
+    tbl = make_table()
+    with tbl.batch(flush_every=2):
+        tbl.insert([1, 'Alyssa P. Hacker'])
+        tbl.select()
+        # filling the temporary table of a long isin list is not a write
+        tbl.select(where=col('id').isin(range(200)))
+        assert count(DBNAME, "foo") == 0
+        tbl.insert([2, 'Ben Bitdiddle'])
+        assert count(DBNAME, "foo") == 2
+        tbl.insert([3, 'Louis Reasoner'])
+        assert count(DBNAME, "foo") == 2
+    assert count(DBNAME, "foo") == 3
+    remove_db()
+
+
+def test_batch_flush_interval():
+    """Check that a batch is flushed after an interval"""
+    tbl = make_table()
+    with tbl.batch(flush_interval=0):
+        tbl.insert([1, 'Alyssa P. Hacker'])
+        assert count(DBNAME, "foo") == 1
+    remove_db()
+
+
+def test_batch_nested():
+    """Check that only the outer transaction commits"""
+    tbl = make_table()
+    with transaction(DBNAME):
+        with tbl.batch():
+            tbl.insert([1, 'Alyssa P. Hacker'])
+        assert count(DBNAME, "foo") == 0
+    assert count(DBNAME, "foo") == 1
+    remove_db()
+
+
+@raises(sqlite3.IntegrityError)
+def test_batch_plain_connection():
+    """Check that batches work on plain sqlite3 connections"""
+    conn = sqlite3.connect(':memory:')
+    tbl = Table.create(
+        conn, "foo", [('id', int), ('name', str)], primary_key='id')
+    tbl.insert([1, 'Alyssa P. Hacker'])
+    try:
+        with tbl.batch():
+            tbl.insert([2, 'Ben Bitdiddle'])
+            assert get_transaction(conn) is not None
+            tbl.insert([1, 'Alyssa P. Hacker'])
+    finally:
+        assert get_transaction(conn) is None
+        assert list(tbl.select().index) == [1]
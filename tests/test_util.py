@@ -1,6 +1,10 @@
+import numpy as np
+import sqlite3
+
 from nose.tools import raises
 
-from dbtools.util import dict_to_dtypes
+from dbtools import util
+from dbtools.util import dict_to_dtypes, to_sql_column
 
 
 def test_dict_to_dtypes_1():
@@ -47,3 +51,38 @@ def test_dict_to_dtypes_5():
          {'name': None, 'fruit': True, 'tree': False},
          {'name': None, 'fruit': None, 'tree': False}]
     dict_to_dtypes(d)
+
+
+def test_to_sql_column_int():
+    """Convert an integer array to a sql column"""
+    dtype, column = to_sql_column(np.array([1, 2, 3], dtype='int32'))
+    assert dtype is int
+    assert column == [1, 2, 3]
+    assert all(type(x) is int for x in column)
+
+
+def test_to_sql_column_object():
+    """Convert an object array with missing values to a sql column"""
+    dtype, column = to_sql_column(
+        np.array([None, 'apple', np.nan, 'pear'], dtype='object'))
+    assert dtype is str
+    assert column == [None, 'apple', None, 'pear']
+
+
+@raises(ValueError)
+def test_to_sql_column_null():
+    """Fail to convert a column with only missing values"""
+    to_sql_column(np.array([None, None], dtype='object'))
+
+
+def test_connection_state_plain():
+    """Keep the state of the most recent plain sqlite3 connections"""
+    conns = [sqlite3.connect(':memory:')
+             for i in range(util.max_plain_connections + 1)]
+    first = util.connection_state(conns[0], "test", lambda conn: [conn])
+    assert util.connection_state(conns[0], "test", lambda conn: []) is first
+    for conn in conns[1:]:
+        util.connection_state(conn, "test", lambda conn: [conn])
+    # the least recently used state has been discarded
+    assert util.connection_state(conns[0], "test", lambda conn: []) == []
+    assert conns[1] not in util._plain_state
@@ -0,0 +1,134 @@
+import numpy as np
+
+from nose.tools import raises
+
+from dbtools import Table
+from dbtools import where
+from dbtools.util import max_variables
+from dbtools.where import col, compile_where
+from . import DBNAME, remove_db
+
+
+def create():
+    tbl = Table.create(
+        ':memory:', "Foo",
+        [('id', int), ('name', str), ('age', int), ('height', float)],
+        primary_key='id', verbose=True)
+    tbl.insert([
+        [1, 'Alyssa P. Hacker', 25, 66.25],
+        [2, 'Ben Bitdiddle', 24, 70.1],
+        [3, 'Cy D. Fect', None, 69.0]])
+    return tbl
+
+
+def test_compile_dict():
+    """Compile dictionaries in order of column name"""
+    sql, args = compile_where(
+        {'name': ['a', 'b'], 'age': 25, 'height': ('>', 1.7),
+         'id': None})
+    assert sql == "age=? AND height>? AND id IS NULL AND name IN (?,?)"
+    assert args == [25, 1.7, 'a', 'b']
+
+
+def test_compile_columns():
+    """Compile conditions built from columns"""
+    cond = ((col('age') >= 25) | (col('name') != 'x')) & ~col('id').isnull()
+    sql, args = compile_where(cond)
+    assert sql == "(age>=? OR name!=?) AND NOT (id IS NULL)"
+    assert args == [25, 'x']
+    sql, args = compile_where(col('age') < 3)
+    assert sql == "age<?"
+    assert compile_where(("age=? OR name=?", (25, 'x'))) == (
+        "age=? OR name=?", [25, 'x'])
+
+
+def test_select_dict():
+    """Select with dictionary conditions"""
+    tbl = create()
+    assert list(tbl.select(where={'age': 25}).index) == [1]
+    assert list(tbl.select(where={'age': None}).index) == [3]
+    assert list(tbl.select(where={'height': ('>', 69.5)}).index) == [2]
+    assert list(tbl.select(where={'id': [1, 3]}).index) == [1, 3]
+
+
+def test_select_columns():
+    """Select, update and delete with column conditions"""
+    tbl = create()
+    cond = (col('age') > 24) | col('name').like('Cy%')
+    assert list(tbl.select(where=cond).index) == [1, 3]
+    tbl.update({'age': 30}, where=col('id') == 3)
+    assert tbl[3]['age'][3] == 30
+    tbl.delete(where=col('id').isin([1, 2]))
+    assert list(tbl.select().index) == [3]
+
+
+def test_select_isin_temp_table():
+    """Check that long isin lists use a temporary table"""
+    tbl = create()
+    tbl.insert([[i, str(i), i, 1.0] for i in range(4, 1001)])
+    keys = list(range(2, 1001, 2))
+    cond = col('id').isin(keys)
+    sql, args = compile_where(cond, tbl.db)
+    assert sql == "id IN (SELECT value FROM temp._dbtools_in_0)"
+    assert args == []
+    assert list(tbl.select(where=cond).index) == keys
+
+    # the temporary table is refilled every time
+    assert list(tbl.select(where=col('id').isin(keys[:200])).index) == \
+        keys[:200]
+    assert sorted(tbl.select(
+        columns='name', where=(col('id').isin(keys[:150]) &
+                               col('age').isin(keys[100:]))).index) == \
+        keys[100:150]
+
+
+def test_select_isin_readonly():
+    """Check that long isin lists are inlined on read-only connections"""
+    remove_db()
+    tbl = Table.create(DBNAME, "Foo", [('id', int)], primary_key='id')
+    tbl.insert([[i] for i in range(3 * max_variables)])
+    readonly = Table(DBNAME, "Foo", readonly=True)
+    keys = list(range(0, 3 * max_variables, 2))
+    sql, args = compile_where(col('id').isin(range(200)), readonly.db)
+    assert sql == "id IN (%s)" % ",".join("?" * 200)
+    sql, args = compile_where(col('id').isin(keys), readonly.db)
+    assert sql.count("IN") == 2 and args == keys
+    assert list(readonly.select(where=col('id').isin(keys)).index) == keys
+
+    # parallel selects compile the condition on read-only connections
+    data = tbl.parallel_select(where={'id': keys[:200]}, partitions=2)
+    assert list(data.index) == keys[:200]
+    remove_db()
+
+
+def test_select_numpy():
+    """Select with NumPy values"""
+    tbl = create()
+    assert list(tbl.select(where=col('age') == np.int64(25)).index) == [1]
+    assert list(tbl.select(where={'age': np.int32(24)}).index) == [2]
+    assert list(tbl.select(where={'id': np.array([1, 3])}).index) == [1, 3]
+    cond = col('id').isin(np.arange(2, 200))
+    assert list(tbl.select(where=cond).index) == [2, 3]
+    sql, args = compile_where(
+        {'id': np.array([1, 3], dtype='uint8'), 'name': np.str_('x')})
+    assert args == [1, 3, 'x']
+    assert [type(arg) for arg in args] == [int, int, str]
+
+
+def test_statement_reuse():
+    """Check that equal conditions compile to the same SQL"""
+    a = compile_where({'age': 25, 'name': 'x'})
+    b = compile_where({'name': 'y', 'age': 30})
+    assert a[0] == b[0]
+
+
+@raises(ValueError)
+def test_invalid_operator():
+    """Check that unknown operators are rejected"""
+    compile_where({'age': ('~', 3)})
+
+
+@raises(ValueError)
+def test_invalid_condition():
+    """Check that invalid conditions are rejected"""
+    where.as_condition(3)
@@ -0,0 +1,114 @@
+import threading
+
+from nose.tools import raises
+from sqlite3 import IntegrityError
+from unittest import SkipTest
+
+try:
+    import concurrent.futures
+except ImportError:
+    raise SkipTest("dbtools.writer needs concurrent.futures")
+
+from dbtools import Table
+from dbtools.writer import Writer
+from . import DBNAME, remove_db
+
+
+def create():
+    remove_db()
+    return Table.create(
+        DBNAME, "Foo", [('id', int), ('name', str)], primary_key='id')
+
+
+def test_writer_threads():
+    """Insert from many threads through one writer"""
+    tbl = create()
+    with Writer(DBNAME) as writer:
+        foo = writer.table("Foo")
+        futures = []
+
+        def produce(start):
+            for i in range(start, start + 50):
+                futures.append(foo.insert([i, str(i)]))
+
+        threads = [threading.Thread(target=produce, args=(i * 50,))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            assert future.result() is None
+
+    data = tbl.select()
+    assert list(data.index) == list(range(200))
+    assert Table(DBNAME, "Foo").db.execute(
+        "PRAGMA journal_mode").fetchone()[0] == 'wal'
+    remove_db()
+
+
+def test_writer_failure():
+    """Check that a failed write only rolls back itself"""
+    tbl = create()
+    with Writer(DBNAME) as writer:
+        foo = writer.table("Foo")
+        first = foo.insert([1, 'a'])
+        second = foo.insert([1, 'b'])
+        third = foo.update({'name': 'c'}, where="id=1")
+        writer.flush()
+        assert first.result() is None
+        assert isinstance(second.exception(), IntegrityError)
+        assert third.result() is None
+    assert list(tbl.select()['name']) == ['c']
+    remove_db()
+
+
+def test_writer_submit():
+    """Submit a function to the writer"""
+    tbl = create()
+    with Writer(DBNAME, profile=None) as writer:
+        future = writer.submit(
+            lambda conn, n: Table(conn, "Foo").insert(
+                [[i, str(i)] for i in range(n)]) or n, 5)
+        assert future.result() == 5
+        assert writer.table("Foo").delete_keys([0, 1]).result() == 2
+    assert list(tbl.select().index) == [2, 3, 4]
+    remove_db()
+
+
+def test_writer_aborted():
+    """Check that every item fails when the transaction is aborted"""
+    create()
+    running = threading.Event()
+    started = threading.Event()
+
+    def block(conn):
+        running.set()
+        return started.wait(5)
+
+    with Writer(DBNAME) as writer:
+        foo = writer.table("Foo")
+        # hold the writer, so that the next items are in one batch
+        blocker = writer.submit(block)
+        running.wait(5)
+        futures = [
+            foo.insert([1, 'a']),
+            writer.submit(lambda conn: conn.execute("ROLLBACK")),
+            foo.insert([2, 'b'])]
+        started.set()
+        assert blocker.result(5)
+        for future in futures:
+            assert future.exception(5) is not None
+    remove_db()
+
+
+@raises(ValueError)
+def test_writer_closed():
+    """Check that a closed writer rejects writes"""
+    create()
+    writer = Writer(DBNAME)
+    writer.close()
+    try:
+        writer.table("Foo").insert([1, 'a'])
+    finally:
+        remove_db()